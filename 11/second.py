@@ -1,47 +1,416 @@
 #!/usr/bin/env python3
 
+from __future__ import annotations
+
+import argparse
+import pickle
 import sys
+from bisect import bisect_right
 from collections import defaultdict
+from collections.abc import Iterable
+from operator import mul
+from pathlib import Path
 
 YEAR = 2024
+SELF_CHECK_BLINKS = 25
+RECURRENCE_MARGIN = 32
+
+PRIME_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+
+POWERS_OF_TEN: list[int] = [10**i for i in range(20)]
 
 
-def string_to_stones(line: str) -> dict[str, int]:
-    stones: dict[str, int] = defaultdict(int)
+def string_to_stones(line: str) -> dict[int, int]:
+    stones: dict[int, int] = defaultdict(int)
     for stone in line.split():
-        stones[stone] += 1
+        stones[int(stone)] += 1
 
     return stones
 
 
-def strip_leading_zeros(string: str) -> str:
-    stripped = string.lstrip("0")
-    return "0" if len(stripped) == 0 else stripped
+def count_digits(stone: int) -> int:
+    while stone >= POWERS_OF_TEN[-1]:
+        POWERS_OF_TEN.append(POWERS_OF_TEN[-1] * 10)
 
+    return bisect_right(POWERS_OF_TEN, stone)
+
+
+class StoneCounter:
+    """Counts stones per (stone, remaining blinks), the counts can be saved and
+    reused by later runs with any number of blinks"""
+
+    def __init__(self, counts: dict[tuple[int, int], int] | None = None) -> None:
+        self.transitions: dict[int, tuple[int, ...]] = {}
+        self.counts: dict[tuple[int, int], int] = counts if counts else {}
+
+    @staticmethod
+    def load(path: Path) -> StoneCounter:
+        if not path.exists():
+            return StoneCounter()
+
+        with path.open("rb") as file:
+            return StoneCounter(pickle.load(file))
+
+    def save(self, path: Path) -> None:
+        with path.open("wb") as file:
+            pickle.dump(self.counts, file)
+
+    def transition(self, stone: int) -> tuple[int, ...]:
+        if (stones := self.transitions.get(stone)) is not None:
+            return stones
+
+        if stone == 0:
+            stones = (1,)
+        elif (digits := count_digits(stone)) % 2 == 0:
+            stones = divmod(stone, POWERS_OF_TEN[digits // 2])
+        else:
+            stones = (stone * YEAR,)
+
+        self.transitions[stone] = stones
+        return stones
+
+    def count(self, stone: int, blinks: int) -> int:
+        if blinks == 0:
+            return 1
+
+        counts = self.counts
+        root = (stone, blinks)
+
+        # Depth first without recursion, blink counts can go into the thousands
+        stack = [root]
+        while stack:
+            key = stack[-1]
+            if key in counts:
+                stack.pop()
+                continue
+
+            stone, remaining = key
+            children = self.transition(stone)
+
+            if remaining == 1:
+                counts[key] = len(children)
+                stack.pop()
+                continue
+
+            missing = [
+                (child, remaining - 1)
+                for child in children
+                if (child, remaining - 1) not in counts
+            ]
+            if missing:
+                stack.extend(missing)
+                continue
+
+            counts[key] = sum(counts[(child, remaining - 1)] for child in children)
+            stack.pop()
+
+        return counts[root]
 
-def apply_rules(stones: dict[str, int]) -> dict[str, int]:
-    new_stones: dict[str, int] = defaultdict(int)
-    for stone, count in stones.items():
-        if stone == "0":
-            new_stones["1"] += count
 
-        elif len(stone) % 2 == 0:
-            new_stones[stone[: len(stone) // 2]] += count
-            new_stones[strip_leading_zeros(stone[len(stone) // 2 :])] += count
+def count_stones(stones: dict[int, int], blinks: int, counter: StoneCounter) -> int:
+    return sum(counter.count(stone, blinks) * count for stone, count in stones.items())
 
+
+def find_closed_values(stones: Iterable[int], counter: StoneCounter) -> dict[int, int]:
+    """Indexes every value the stones can ever turn into"""
+
+    values: dict[int, int] = {}
+    queue = list(stones)
+
+    while queue:
+        stone = queue.pop()
+        if stone in values:
+            continue
+
+        values[stone] = len(values)
+        queue.extend(counter.transition(stone))
+
+    return values
+
+
+def build_parents(values: dict[int, int], counter: StoneCounter) -> list[list[int]]:
+    """Indexes of the values every value comes from, once per stone it gets"""
+
+    parents: list[list[int]] = [[] for _ in range(len(values))]
+    for stone, i in values.items():
+        for child in counter.transition(stone):
+            parents[values[child]].append(i)
+
+    return parents
+
+
+def blink_vector(
+    vector: list[int], parents: list[list[int]], modulus: int
+) -> list[int]:
+    return [sum(map(vector.__getitem__, sources)) % modulus for sources in parents]
+
+
+def is_prime(number: int) -> bool:
+    """Miller-Rabin, deterministic below 3.3 * 10^24"""
+
+    if number < 2:
+        return False
+
+    for prime in PRIME_BASES:
+        if number % prime == 0:
+            return number == prime
+
+    odd, twos = number - 1, 0
+    while odd % 2 == 0:
+        odd //= 2
+        twos += 1
+
+    for base in PRIME_BASES:
+        x = pow(base, odd, number)
+        if x in (1, number - 1):
+            continue
+
+        for _ in range(twos - 1):
+            x = x * x % number
+            if x == number - 1:
+                break
         else:
-            new_stones[str(int(stone) * YEAR)] += count
+            return False
+
+    return True
+
+
+class LinearRecurrence:
+    """Shortest linear recurrence of a sequence modulo a prime, found term by term
+    with Berlekamp-Massey
+
+    connection holds 1, c1, ..., cL, so that term[i] + c1 * term[i - 1] + ...
+    + cL * term[i - L] is 0 for every i >= L.
+    """
 
-    return new_stones
+    def __init__(self, modulus: int) -> None:
+        self.modulus = modulus
+        self.terms: list[int] = []
+        self.connection = [1]
+        self.length = 0
+        self.previous = [1]
+        self.previous_discrepancy = 1
+        self.shift = 1
+
+    def add(self, term: int) -> None:
+        modulus = self.modulus
+        terms = self.terms
+        terms.append(term)
+        i = len(terms) - 1
+
+        connection = self.connection
+        discrepancy = (
+            term + sum(map(mul, connection[1 : self.length + 1], reversed(terms[:i])))
+        ) % modulus
+        if discrepancy == 0:
+            self.shift += 1
+            return
+
+        factor = discrepancy * pow(self.previous_discrepancy, -1, modulus) % modulus
+        updated = connection + [0] * (len(self.previous) + self.shift - len(connection))
+        for j, value in enumerate(self.previous, self.shift):
+            updated[j] = (updated[j] - factor * value) % modulus
+
+        if 2 * self.length <= i:
+            self.previous = connection
+            self.previous_discrepancy = discrepancy
+            self.length = i + 1 - self.length
+            self.shift = 1
+        else:
+            self.shift += 1
+
+        self.connection = updated[: self.length + 1]
+
+    def holds_for(self, vector: list[int], parents: list[list[int]]) -> bool:
+        """Whether the vectors of counts per value follow the recurrence too, then
+        the sums of their counts do for every number of blinks"""
+
+        modulus = self.modulus
+        total = [0] * len(vector)
+        for coefficient in reversed(self.connection):
+            total = [(x + coefficient * y) % modulus for x, y in zip(total, vector)]
+            vector = blink_vector(vector, parents, modulus)
+
+        return not any(total)
+
+    def evaluate(self, index: int) -> int:
+        """Term at any index from x^index modulo the characteristic polynomial,
+        with polynomial products done on packed big integers"""
+
+        modulus = self.modulus
+        length = self.length
+        if length == 0:
+            return 0
+
+        # Coefficients from the lowest power, x^L + c1 * x^(L - 1) + ... + cL
+        characteristic = self.connection[::-1]
+        slot = (2 * modulus.bit_length() + length.bit_length() + 8) // 8
+
+        def multiply(left: list[int], right: list[int]) -> list[int]:
+            packed = pack(left, slot) * pack(right, slot)
+            return unpack(packed, slot, len(left) + len(right) - 1, modulus)
+
+        # Inverse of the reversed characteristic polynomial as a power series,
+        # it turns the division by it into a multiplication
+        inverse = [1]
+        connection = self.connection
+        for k in range(1, length - 1):
+            terms = sum(map(mul, connection[1 : k + 1], reversed(inverse[-length:])))
+            inverse.append(-terms % modulus)
+
+        def reduce(polynomial: list[int]) -> list[int]:
+            if len(polynomial) <= length:
+                return polynomial
+
+            size = len(polynomial) - length
+            quotient = multiply(polynomial[::-1][:size], inverse[:size])[:size][::-1]
+            product = multiply(quotient, characteristic)
+            return [(x - y) % modulus for x, y in zip(polynomial[:length], product)]
+
+        remainder = [1]
+        for bit in bin(index)[2:]:
+            remainder = reduce(multiply(remainder, remainder))
+            if bit == "1":
+                remainder = reduce([0, *remainder])
+
+        return sum(map(mul, remainder, self.terms)) % modulus
+
+
+def pack(coefficients: list[int], slot: int) -> int:
+    return int.from_bytes(
+        b"".join(coefficient.to_bytes(slot, "little") for coefficient in coefficients),
+        "little",
+    )
+
+
+def unpack(number: int, slot: int, count: int, modulus: int) -> list[int]:
+    data = number.to_bytes(slot * count, "little")
+    return [
+        int.from_bytes(data[i : i + slot], "little") % modulus
+        for i in range(0, slot * count, slot)
+    ]
+
+
+def find_recurrence(
+    stones: dict[int, int], counter: StoneCounter, modulus: int, blinks: int
+) -> LinearRecurrence:
+    """Blinks the counts per closed value until the total follows a recurrence,
+    or until blinks is reached"""
+
+    values = find_closed_values(stones, counter)
+    parents = build_parents(values, counter)
+
+    start = [0] * len(values)
+    for stone, count in stones.items():
+        start[values[stone]] = count % modulus
+
+    recurrence = LinearRecurrence(modulus)
+    vector = start
+    # The recurrence of the totals never gets longer than the number of values,
+    # twice that many terms pin it down without any check
+    next_check = 0
+    while len(recurrence.terms) <= min(blinks, 2 * len(values)):
+        recurrence.add(sum(vector) % modulus)
+        terms = len(recurrence.terms)
+
+        if terms >= max(next_check, 2 * recurrence.length + RECURRENCE_MARGIN):
+            if recurrence.holds_for(start, parents):
+                break
+            next_check = 2 * terms
+
+        vector = blink_vector(vector, parents, modulus)
+
+    return recurrence
+
+
+def count_stones_recurrence(
+    stones: dict[int, int],
+    blinks: int,
+    counter: StoneCounter,
+    modulus: int,
+    check: bool = True,
+) -> int:
+    """Count modulo a prime after any number of blinks, in time logarithmic in
+    blinks once the recurrence of the closed value set is known
+
+    The check compares the first few counts against the counter, through the
+    recurrence whenever the count itself goes through it.
+    """
+
+    recurrence = find_recurrence(stones, counter, modulus, blinks)
+    # Short runs stop before the recurrence is needed, their count is a term
+    shortcut = blinks < len(recurrence.terms)
+
+    def count(index: int) -> int:
+        return recurrence.terms[index] if shortcut else recurrence.evaluate(index)
+
+    if check:
+        for checked in range(min(blinks, SELF_CHECK_BLINKS) + 1):
+            expected = count_stones(stones, checked, counter) % modulus
+            if (found := count(checked)) != expected:
+                raise RuntimeError(
+                    f"recurrence gives {found} after {checked} blinks,"
+                    f" expected {expected}"
+                )
+
+    return count(blinks)
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--blinks", type=int, default=75)
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        metavar="PATH",
+        help="load and save the (stone, remaining blinks) counts",
+    )
+    parser.add_argument(
+        "--recurrence",
+        action="store_true",
+        help="count modulo a prime --modulus through the linear recurrence the"
+        " total follows, found by Berlekamp-Massey and jumped along by Kitamasa,"
+        " logarithmic in blinks",
+    )
+    parser.add_argument(
+        "--modulus",
+        type=int,
+        help="print the count modulo MODULUS, keeps huge blink counts cheap",
+    )
+    parser.add_argument(
+        "--no-check",
+        action="store_true",
+        help="skip comparing the --recurrence mode against the counter for up to"
+        f" {SELF_CHECK_BLINKS} blinks",
+    )
+    args = parser.parse_args()
+
+    # Exact counts grow by a digit every few blinks, only a modulus keeps the
+    # work logarithmic, and Berlekamp-Massey divides by the discrepancies
+    if args.recurrence and not (args.modulus and is_prime(args.modulus)):
+        parser.error("--recurrence needs a prime --modulus")
+
+    counter = StoneCounter.load(args.cache) if args.cache else StoneCounter()
+
     input_stones = sys.stdin.read().strip()
     stones = string_to_stones(input_stones)
-    for _ in range(75):
-        stones = apply_rules(stones)
 
-    print(sum(count for count in stones.values()))
+    # Counts after many blinks have far more digits than int() allows by default
+    sys.set_int_max_str_digits(0)
+
+    if args.recurrence:
+        print(
+            count_stones_recurrence(
+                stones, args.blinks, counter, args.modulus, not args.no_check
+            )
+        )
+    elif args.modulus:
+        print(count_stones(stones, args.blinks, counter) % args.modulus)
+    else:
+        print(count_stones(stones, args.blinks, counter))
+
+    if args.cache:
+        counter.save(args.cache)
 
 
 if __name__ == "__main__":
@@ -2,108 +2,234 @@
 
 from __future__ import annotations
 
-from collections import deque
+import argparse
+import re
+import sys
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
+from typing import BinaryIO
 
-type GardenMap = list[list[str]]
+type Run = int
+type RowRuns = tuple[bytes, list[int], Run]
+type RegionTotals = tuple[int, int, int]
 
+RUN_PATTERN = re.compile(rb"(.)\1*", re.DOTALL)
 
-@dataclass(frozen=True)
-class Position:
-    x: int
-    y: int
 
-    def __add__(self, other: Position) -> Position:
-        return Position(self.x + other.x, self.y + other.y)
+@dataclass
+class Garden:
+    """Row-major plots, one byte per plot"""
 
-    def __sub__(self, other: Position) -> Position:
-        return Position(self.x - other.x, self.y - other.y)
+    cells: bytes
+    width: int
+    height: int
 
-    @staticmethod
-    def is_valid(position: Position, garden_map: GardenMap) -> bool:
-        return (
-            position.x >= 0
-            and position.x < len(garden_map[0])
-            and position.y >= 0
-            and position.y < len(garden_map)
-        )
+    def rows(self) -> Iterator[bytes]:
+        for y in range(self.height):
+            yield self.cells[y * self.width : (y + 1) * self.width]
 
     @staticmethod
-    def get_nearby_positions(position: Position) -> list[Position]:
-        return [
-            position + Position(0, 1),
-            position - Position(0, 1),
-            position + Position(1, 0),
-            position - Position(1, 0),
-        ]
-
-
-def parse_input() -> GardenMap:
-    current_map: GardenMap = []
+    def from_lines(lines: list[str]) -> Garden:
+        return Garden("".join(lines).encode(), len(lines[0]), len(lines))
+
+
+class Regions:
+    """Union-find over the runs of equal plants in the last two rows and the
+    roots of the regions still open, each run keeps the area, perimeter and
+    horizontal sides it adds to its region"""
+
+    def __init__(self) -> None:
+        self.parents: dict[Run, Run] = {}
+        self.totals: dict[Run, list[int]] = {}
+        self.merged: list[Run] = []
+        self.next_run: Run = 0
+
+    def add_row(self, row: bytes) -> RowRuns:
+        ends = [match.end() for match in RUN_PATTERN.finditer(row)]
+        first = self.next_run
+
+        start = 0
+        for run, end in enumerate(ends, first):
+            self.parents[run] = run
+            # Neighbouring runs always hold different plants
+            self.totals[run] = [end - start, 2, 0]
+            start = end
+
+        self.next_run += len(ends)
+        return row, ends, first
+
+    def find(self, run: Run) -> Run:
+        parents = self.parents
+        while parents[run] != run:
+            parents[run] = parents[parents[run]]
+            run = parents[run]
+
+        return run
+
+    def union(self, first: Run, second: Run) -> None:
+        first, second = self.find(first), self.find(second)
+        if first == second:
+            return
+
+        # Older runs stay roots, so a root outlives the rows it started in
+        if first > second:
+            first, second = second, first
+
+        self.parents[second] = first
+        self.merged.append(second)
+
+    def close_edge(self, runs: RowRuns) -> None:
+        """Fences the side of a row that faces out of the garden"""
+
+        _, ends, first = runs
+
+        start = 0
+        for run, end in enumerate(ends, first):
+            total = self.totals[run]
+            total[1] += end - start
+            total[2] += 1
+            start = end
+
+    def join_rows(self, above: RowRuns, below: RowRuns) -> None:
+        """Merges the runs touching across the line between two rows and fences
+        the rest, one fenced stretch under or over a run is one side"""
+
+        above_row, above_ends, above_first = above
+        below_row, below_ends, below_first = below
+        totals = self.totals
+
+        i = j = 0
+        start = 0
+        above_fenced = below_fenced = False
+
+        # The run boundaries of both rows split the line into stretches with
+        # a single plant on each side
+        while start < len(above_row):
+            above_end = above_ends[i]
+            below_end = below_ends[j]
+            end = min(above_end, below_end)
+
+            if above_row[start] == below_row[start]:
+                self.union(above_first + i, below_first + j)
+                above_fenced = below_fenced = False
+            else:
+                above_total = totals[above_first + i]
+                below_total = totals[below_first + j]
+                above_total[1] += end - start
+                below_total[1] += end - start
+                if not above_fenced:
+                    above_total[2] += 1
+                    above_fenced = True
+                if not below_fenced:
+                    below_total[2] += 1
+                    below_fenced = True
+
+            if end == above_end:
+                i += 1
+                above_fenced = False
+            if end == below_end:
+                j += 1
+                below_fenced = False
+
+            start = end
+
+    def release(self, above: RowRuns, below: RowRuns | None) -> Iterator[RegionTotals]:
+        """Forgets the runs of the older row and yields the area, perimeter and
+        sides of every region that does not reach the newer one"""
+
+        parents = self.parents
+        totals = self.totals
+        above_runs = range(above[2], above[2] + len(above[1]))
+        below_runs = range(below[2], below[2] + len(below[1])) if below else range(0)
+
+        # Runs of the newer row still collect fences from the next row
+        retired = {*above_runs, *self.merged}.difference(below_runs)
+        self.merged.clear()
+
+        closing = {self.find(run) for run in above_runs}
+
+        for run in retired:
+            root = self.find(run)
+            if root != run:
+                area, perimeter, sides = totals.pop(run)
+                total = totals[root]
+                total[0] += area
+                total[1] += perimeter
+                total[2] += sides
+
+        for run in below_runs:
+            parents[run] = self.find(run)
+            closing.discard(parents[run])
+
+        for run in retired:
+            if parents[run] != run:
+                del parents[run]
+
+        for root in closing:
+            del parents[root]
+            area, perimeter, sides = totals.pop(root)
+            # Sides alternate between horizontal and vertical along every fence
+            yield area, perimeter, 2 * sides
+
+
+def parse_input() -> Garden:
+    lines: list[str] = []
 
     try:
         while (line := input()) is not None:
-            current_map.append(list(line))
+            lines.append(line)
     except EOFError:
         pass
 
-    return current_map
-
-
-def get_area_and_perimeter(
-    position: Position, garden_map: GardenMap
-) -> tuple[int, int, set[Position]]:
-    needle = garden_map[position.y][position.x]
+    return Garden.from_lines(lines)
 
-    queue: deque[Position] = deque()
-    queue.append(position)
 
-    visited_positions: set[Position] = {position}
+def read_rows(stream: BinaryIO) -> Iterator[bytes]:
+    for line in stream:
+        if row := line.rstrip(b"\r\n"):
+            yield row
 
-    perimeter = 0
 
-    while queue:
-        position = queue.pop()
+def scan_regions(rows: Iterable[bytes]) -> Iterator[RegionTotals]:
+    """Labels the regions in a single scan over the rows, yielding the area,
+    perimeter and sides of each region as soon as it is closed"""
 
-        for position in Position.get_nearby_positions(position):
-            if position in visited_positions:
-                continue
+    regions = Regions()
+    above: RowRuns | None = None
 
-            if (
-                not Position.is_valid(position, garden_map)
-                or garden_map[position.y][position.x] != needle
-            ):
-                perimeter += 1
-                continue
+    for row in rows:
+        below = regions.add_row(row)
+        if above is None:
+            regions.close_edge(below)
+        else:
+            regions.join_rows(above, below)
+            yield from regions.release(above, below)
 
-            queue.append(position)
-            visited_positions.add(position)
+        above = below
 
-    return len(visited_positions), perimeter, visited_positions
+    if above is not None:
+        regions.close_edge(above)
+        yield from regions.release(above, None)
 
 
-def calculate_price(garden_map: GardenMap) -> int:
-    price = 0
-    visited_positions: set[Position] = set()
-
-    for y in range(len(garden_map)):
-        for x in range(len(garden_map[0])):
-            if Position(x, y) in visited_positions:
-                continue
-
-            area, perimeter, currently_visited = get_area_and_perimeter(
-                Position(x, y), garden_map
-            )
-            price += area * perimeter
-            visited_positions.update(currently_visited)
-
-    return price
+def calculate_price(rows: Iterable[bytes]) -> int:
+    return sum(area * perimeter for area, perimeter, _ in scan_regions(rows))
 
 
 def main() -> None:
-    garden_map = parse_input()
-
-    print(calculate_price(garden_map))
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="read the map row by row, memory is bounded by the row width",
+    )
+    args = parser.parse_args()
+
+    if args.stream:
+        print(calculate_price(read_rows(sys.stdin.buffer)))
+    else:
+        garden = parse_input()
+        print(calculate_price(garden.rows()))
 
 
 if __name__ == "__main__":
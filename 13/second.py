@@ -2,10 +2,23 @@
 
 from __future__ import annotations
 
+import argparse
+import re
 import sys
 from dataclasses import dataclass
 from typing import Iterable
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# A claw machine per index, columns of a.x, a.y, b.x, b.y, result.x, result.y
+type Columns = list[list[int]]
+
+PRIZE_OFFSET = 10000000000000
+INT64_LIMIT = 2**63
+
 
 @dataclass(frozen=True)
 class Vector:
@@ -19,6 +32,57 @@ class Vector:
         return self.x * other.x + self.y * other.y
 
 
+def extended_gcd(a: int, b: int) -> tuple[int, int, int]:
+    """Returns gcd(a, b) and x, y with a * x + b * y == gcd(a, b)"""
+
+    x, next_x, y, next_y = 1, 0, 0, 1
+    while b:
+        quotient, remainder = divmod(a, b)
+        a, b = b, remainder
+        x, next_x = next_x, x - quotient * next_x
+        y, next_y = next_y, y - quotient * next_y
+
+    return a, x, y
+
+
+def solve_parallel(a: int, b: int, result: int, price: Vector) -> int:
+    """Cheapest a * i + b * j == result with i, j >= 0, buttons on the same line
+    move the claw forward"""
+
+    divisor, x, y = extended_gcd(a, b)
+    if result % divisor:
+        return 0
+
+    # All the solutions are i = x + t * a_step, j = y - t * b_step
+    x, y = x * (result // divisor), y * (result // divisor)
+    a_step, b_step = b // divisor, a // divisor
+    lowest, highest = -(x // a_step), y // b_step
+    if lowest > highest:
+        return 0
+
+    # The price is linear in t, so one of the ends is the cheapest
+    t = lowest if price.x * a_step >= price.y * b_step else highest
+    return Vector(x + t * a_step, y - t * b_step).dot(price)
+
+
+def solve_machine(
+    ax: int, ay: int, bx: int, by: int, rx: int, ry: int, price: Vector
+) -> int:
+    # Cramer's rule, exact on integers of any size
+    determinant = ax * by - ay * bx
+    if determinant == 0:
+        if ax * ry != ay * rx or bx * ry != by * rx:
+            return 0
+        return solve_parallel(ax, bx, rx, price)
+
+    a_presses, a_rest = divmod(rx * by - ry * bx, determinant)
+    b_presses, b_rest = divmod(ax * ry - ay * rx, determinant)
+    if a_rest or b_rest or a_presses < 0 or b_presses < 0:
+        return 0
+
+    return Vector(a_presses, b_presses).dot(price)
+
+
 @dataclass(eq=False, match_args=False)
 class Equation:
     a: Vector
@@ -26,19 +90,10 @@ class Equation:
     result: Vector
 
     def solve(self, price: Vector) -> int:
-        # https://www.geeksforgeeks.org/point-of-intersection-of-two-lines-formula/
-        x = (self.b.x * -self.result.y - self.b.y * -self.result.x) / (
-            self.a.x * self.b.y - self.a.y * self.b.x
-        )
-        y = (-self.result.x * self.a.y + self.result.y * self.a.x) / (
-            self.a.x * self.b.y - self.a.y * self.b.x
+        return solve_machine(
+            self.a.x, self.a.y, self.b.x, self.b.y, self.result.x, self.result.y, price
         )
 
-        if not (x == int(x) and y == int(y)):
-            return 0
-
-        return Vector(int(x), int(y)).dot(price)
-
 
 def parse_button_line(line: str) -> Vector:
     _, eq = line.split(":")
@@ -53,7 +108,7 @@ def parse_prize_line(line: str) -> Vector:
     x, y = eq.split(",")
     _, x = x.split("=")
     _, y = y.split("=")
-    return Vector(int(x), int(y)) + Vector(10000000000000, 10000000000000)
+    return Vector(int(x), int(y)) + Vector(PRIZE_OFFSET, PRIZE_OFFSET)
 
 
 def parse_input(lines: list[str]) -> list[Equation]:
@@ -71,6 +126,61 @@ def parse_input(lines: list[str]) -> list[Equation]:
     return equations
 
 
+def parse_columns(data: bytes) -> Columns:
+    numbers = [int(number) for number in re.findall(rb"-?\d+", data)]
+    columns = [numbers[i::6] for i in range(6)]
+    columns[4] = [x + PRIZE_OFFSET for x in columns[4]]
+    columns[5] = [y + PRIZE_OFFSET for y in columns[5]]
+
+    return columns
+
+
+def fits_int64(columns: Columns, price: Vector) -> bool:
+    """Whether every product in the vectorized Cramer's rule fits in int64"""
+
+    if not columns[0]:
+        return True
+
+    button_limit = max(max(map(abs, column)) for column in columns[:4])
+    limit = max(button_limit, max(max(map(abs, column)) for column in columns[4:]))
+    return 2 * button_limit * limit * max(abs(price.x), abs(price.y), 1) < INT64_LIMIT
+
+
+def count_tokens_numpy(columns: Columns, price: Vector) -> int:
+    ax, ay, bx, by, rx, ry = (np.array(column, dtype=np.int64) for column in columns)
+
+    determinant = ax * by - ay * bx
+    parallel = determinant == 0
+    # Parallel buttons are solved one by one, keep them from dividing by zero
+    divisor = np.where(parallel, 1, determinant)
+
+    a_presses, a_rest = np.divmod(rx * by - ry * bx, divisor)
+    b_presses, b_rest = np.divmod(ax * ry - ay * rx, divisor)
+    solved = (
+        ~parallel & (a_rest == 0) & (b_rest == 0) & (a_presses >= 0) & (b_presses >= 0)
+    )
+
+    # The sum over millions of machines may not fit in int64
+    total = sum((a_presses[solved] * price.x + b_presses[solved] * price.y).tolist())
+    for i in np.flatnonzero(parallel).tolist():
+        a_x, a_y, b_x, b_y, result_x, result_y = (column[i] for column in columns)
+        total += solve_machine(a_x, a_y, b_x, b_y, result_x, result_y, price)
+
+    return total
+
+
+def count_tokens_batch(columns: Columns, price: Vector) -> int:
+    """Solves all the machines at once, vectorized when NumPy is available"""
+
+    if np is not None and fits_int64(columns, price):
+        return count_tokens_numpy(columns, price)
+
+    return sum(
+        solve_machine(ax, ay, bx, by, rx, ry, price)
+        for ax, ay, bx, by, rx, ry in zip(*columns)
+    )
+
+
 def count_tokens(equations: Iterable[Equation]) -> int:
     price = Vector(3, 1)
 
@@ -84,6 +194,19 @@ def count_tokens(equations: Iterable[Equation]) -> int:
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="solve all the machines at once from column arrays",
+    )
+    args = parser.parse_args()
+
+    if args.batch:
+        columns = parse_columns(sys.stdin.buffer.read())
+        print(count_tokens_batch(columns, Vector(3, 1)))
+        return
+
     lines = sys.stdin.readlines()
     equations = parse_input(lines)
 
@@ -2,11 +2,22 @@
 
 from __future__ import annotations
 
+import argparse
 import sys
+from array import array
 from collections.abc import Iterable
 from dataclasses import dataclass
+from math import lcm
 
-type Position = Vector
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# NumPy arrays when NumPy is available, array("q") otherwise
+type Column = np.ndarray | array[int]
+# Robots below and above the middle line of an axis, a bit per robot
+type Masks = tuple[int, int]
 
 
 @dataclass(frozen=True)
@@ -14,40 +25,97 @@ class Vector:
     x: int
     y: int
 
-    def __add__(self, other: Vector) -> Vector:
-        return Vector(self.x + other.x, self.y + other.y)
-
-    def __mul__(self, other) -> Vector:
-        if isinstance(other, self.__class__):
-            return Vector(self.x * other.x, self.y * other.y)
-        elif isinstance(other, int):
-            return Vector(self.x * other, self.y * other)
-        else:
-            raise TypeError(
-                f"unsupported operand type(s) for *: '{self.__class__}' and '{type(other)}'"
-            )
 
-    def __mod__(self, other: Vector) -> Vector:
-        return Vector(self.x % other.x, self.y % other.y)
+def to_column(values: list[int]) -> Column:
+    if np is not None:
+        return np.array(values, dtype=np.int64)
+
+    return array("q", values)
+
+
+def calculate_axis_after_steps(
+    positions: Column, velocities: Column, steps: int, size: int
+) -> Column:
+    if np is not None:
+        assert isinstance(positions, np.ndarray)
+        assert isinstance(velocities, np.ndarray)
+        return (positions + velocities * steps) % size
+
+    return array(
+        "q",
+        [
+            (position + velocity * steps) % size
+            for position, velocity in zip(positions, velocities)
+        ],
+    )
 
-    def sum(self) -> int:
-        return self.x + self.y
 
-    def dot(self, other: Vector) -> int:
-        return self.x * other.x + self.y * other.y
+def pack_axis(positions: Column, size: int) -> Masks:
+    half = size // 2
+
+    # Without NumPy a robot takes a whole byte, AND and bit_count work the same
+    if np is not None:
+        assert isinstance(positions, np.ndarray)
+        return (
+            int.from_bytes(np.packbits(positions < half).tobytes()),
+            int.from_bytes(np.packbits(positions > half).tobytes()),
+        )
+
+    return (
+        int.from_bytes(bytes(position < half for position in positions)),
+        int.from_bytes(bytes(position > half for position in positions)),
+    )
 
 
 @dataclass
-class Robot:
-    position: Position
-    velocity: Vector
+class Robots:
+    """Structure of arrays, robot i is at (x[i], y[i]) and moves by (vx[i], vy[i])
+    every step"""
+
+    x: Column
+    y: Column
+    vx: Column
+    vy: Column
+    size: Vector
+
+    def advance(self, steps: int = 1) -> None:
+        self.x = calculate_axis_after_steps(self.x, self.vx, steps, self.size.x)
+        self.y = calculate_axis_after_steps(self.y, self.vy, steps, self.size.y)
+
+    def pack(self) -> tuple[Masks, Masks]:
+        return pack_axis(self.x, self.size.x), pack_axis(self.y, self.size.y)
+
+    def calculate_safety_factor_series(self, steps: int) -> list[int]:
+        """Safety factors after 0 to steps - 1 steps, each axis repeats with its
+        size, so only one period of it is ever moved"""
+
+        x_masks = [
+            pack_axis(
+                calculate_axis_after_steps(self.x, self.vx, step, self.size.x),
+                self.size.x,
+            )
+            for step in range(min(steps, self.size.x))
+        ]
+        y_masks = [
+            pack_axis(
+                calculate_axis_after_steps(self.y, self.vy, step, self.size.y),
+                self.size.y,
+            )
+            for step in range(min(steps, self.size.y))
+        ]
 
-    def calculate_position_after_steps(self, steps: int, wrap: Vector) -> Position:
-        new_position: Position = (self.position + self.velocity * steps) % wrap
-        return new_position
+        period = lcm(self.size.x, self.size.y)
+        factors = [
+            calculate_safety_factor(
+                x_masks[step % self.size.x], y_masks[step % self.size.y]
+            )
+            for step in range(min(steps, period))
+        ]
 
+        return [factors[step % period] for step in range(steps)]
 
-def parse_line(line: str) -> Robot:
+
+def parse_line(line: str) -> tuple[int, int, int, int]:
     p, v = line.split(" ")
 
     _, position_value = p.split("=")
@@ -56,60 +124,60 @@ def parse_line(line: str) -> Robot:
     _, velocity_value = v.split("=")
     x_velocity, y_velocity = velocity_value.split(",")
 
-    return Robot(
-        Vector(int(x_position), int(y_position)),
-        Vector(int(x_velocity), int(y_velocity)),
-    )
-
-
-def parse_input(lines: Iterable[str]) -> list[Robot]:
-    return [parse_line(line) for line in lines]
-
-
-def simulate_steps(n: int, robots: Iterable[Robot], map_size: Vector) -> list[Position]:
-    return [robot.calculate_position_after_steps(n, map_size) for robot in robots]
+    return int(x_position), int(y_position), int(x_velocity), int(y_velocity)
 
 
-def calculate_quadrants(
-    positions: Iterable[Position], size: Vector
-) -> tuple[int, int, int, int]:
-    half_x = size.x // 2
-    half_y = size.y // 2
+def parse_input(lines: Iterable[str], size: Vector) -> Robots:
+    x, y, vx, vy = zip(*(parse_line(line) for line in lines))
+    return Robots(
+        to_column(list(x)),
+        to_column(list(y)),
+        to_column(list(vx)),
+        to_column(list(vy)),
+        size,
+    )
 
-    upper_left = 0
-    upper_right = 0
-    bottom_left = 0
-    bottom_right = 0
 
-    for position in positions:
-        if position.y < half_y:
-            if position.x < half_x:
-                upper_left += 1
-            elif position.x > half_x:
-                upper_right += 1
-        elif position.y > half_y:
-            if position.x < half_x:
-                bottom_left += 1
-            elif position.x > half_x:
-                bottom_right += 1
+def calculate_quadrants(x_masks: Masks, y_masks: Masks) -> tuple[int, int, int, int]:
+    left, right = x_masks
+    upper, bottom = y_masks
 
-    return upper_left, upper_right, bottom_right, bottom_left
+    return (
+        (upper & left).bit_count(),
+        (upper & right).bit_count(),
+        (bottom & right).bit_count(),
+        (bottom & left).bit_count(),
+    )
 
 
-def calculate_safety_factor(positions: Iterable[Position], size: Vector) -> int:
-    a, b, c, d = calculate_quadrants(positions, size)
+def calculate_safety_factor(x_masks: Masks, y_masks: Masks) -> int:
+    a, b, c, d = calculate_quadrants(x_masks, y_masks)
     return a * b * c * d
 
 
 def main() -> None:
-    lines = sys.stdin.readlines()
-    robots = parse_input(lines)
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--series",
+        type=int,
+        metavar="STEPS",
+        help="print the safety factor after each of the first STEPS steps",
+    )
+    args = parser.parse_args()
 
+    lines = sys.stdin.readlines()
     size = Vector(101, 103)
+    robots = parse_input(lines, size)
+
+    if args.series:
+        series = robots.calculate_safety_factor_series(args.series)
+        for step, factor in enumerate(series):
+            print(step, factor)
+        return
 
-    new_positions = simulate_steps(100, robots, size)
+    robots.advance(100)
 
-    print(calculate_safety_factor(new_positions, size))
+    print(calculate_safety_factor(*robots.pack()))
 
 
 if __name__ == "__main__":
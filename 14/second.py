@@ -2,11 +2,24 @@
 
 from __future__ import annotations
 
+import argparse
+import heapq
 import sys
-from collections.abc import Iterable
+import zlib
+from array import array
+from collections.abc import Callable, Iterable
 from dataclasses import dataclass
+from functools import cache
 
-type Position = Vector
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# NumPy arrays when NumPy is available, array("q") otherwise
+type Column = np.ndarray | array[int]
+# Scores a frame, the more structured the frame the lower the score
+type Metric = Callable[[Frame], int]
 
 # Just to know, how the tree looks like
 """
@@ -51,39 +64,44 @@ class Vector:
     x: int
     y: int
 
-    def __add__(self, other: Vector) -> Vector:
-        return Vector(self.x + other.x, self.y + other.y)
 
-    def __mul__(self, other) -> Vector:
-        if isinstance(other, self.__class__):
-            return Vector(self.x * other.x, self.y * other.y)
-        elif isinstance(other, int):
-            return Vector(self.x * other, self.y * other)
-        else:
-            raise TypeError(
-                f"unsupported operand type(s) for *: '{self.__class__}' and '{type(other)}'"
-            )
+def to_column(values: list[int]) -> Column:
+    if np is not None:
+        return np.array(values, dtype=np.int64)
+
+    return array("q", values)
 
-    def __mod__(self, other: Vector) -> Vector:
-        return Vector(self.x % other.x, self.y % other.y)
 
-    def sum(self) -> int:
-        return self.x + self.y
+def calculate_axis_after_steps(
+    positions: Column, velocities: Column, steps: int, size: int
+) -> Column:
+    if np is not None:
+        assert isinstance(positions, np.ndarray)
+        assert isinstance(velocities, np.ndarray)
+        return (positions + velocities * steps) % size
 
-    def dot(self, other: Vector) -> int:
-        return self.x * other.x + self.y * other.y
+    return array(
+        "q",
+        [
+            (position + velocity * steps) % size
+            for position, velocity in zip(positions, velocities)
+        ],
+    )
 
 
 @dataclass
-class Robot:
-    position: Position
-    velocity: Vector
+class Robots:
+    """Structure of arrays, robot i is at (x[i], y[i]) and moves by (vx[i], vy[i])
+    every step"""
 
-    def update_position(self, wrap: Vector) -> None:
-        self.position = (self.position + self.velocity) % wrap
+    x: Column
+    y: Column
+    vx: Column
+    vy: Column
+    size: Vector
 
 
-def parse_line(line: str) -> Robot:
+def parse_line(line: str) -> tuple[int, int, int, int]:
     p, v = line.split(" ")
 
     _, position_value = p.split("=")
@@ -92,46 +110,205 @@ def parse_line(line: str) -> Robot:
     _, velocity_value = v.split("=")
     x_velocity, y_velocity = velocity_value.split(",")
 
-    return Robot(
-        Vector(int(x_position), int(y_position)),
-        Vector(int(x_velocity), int(y_velocity)),
+    return int(x_position), int(y_position), int(x_velocity), int(y_velocity)
+
+
+def parse_input(lines: Iterable[str], size: Vector) -> Robots:
+    x, y, vx, vy = zip(*(parse_line(line) for line in lines))
+    return Robots(
+        to_column(list(x)),
+        to_column(list(y)),
+        to_column(list(vx)),
+        to_column(list(vy)),
+        size,
     )
 
 
-def parse_input(lines: Iterable[str]) -> list[Robot]:
-    return [parse_line(line) for line in lines]
+def calculate_spread(positions: Column) -> int:
+    """Variance scaled by the squared robot count, so it stays an integer"""
+
+    if np is not None:
+        assert isinstance(positions, np.ndarray)
+        return len(positions) * int(positions @ positions) - int(positions.sum()) ** 2
+
+    squares = sum(position * position for position in positions)
+    return len(positions) * squares - sum(positions) ** 2
+
+
+@dataclass(frozen=True)
+class Frame:
+    """Occupancy bitmap, bit y * size.x + x is set when a robot stands on (x, y)"""
+
+    bits: int
+    size: Vector
+
+
+@cache
+def get_column_masks(size: Vector) -> list[int]:
+    column = sum(1 << y * size.x for y in range(size.y))
+    return [column << x for x in range(size.x)]
+
+
+def pack_frame(robots: Robots, steps: int) -> Frame:
+    size = robots.size
+    x = calculate_axis_after_steps(robots.x, robots.vx, steps, size.x)
+    y = calculate_axis_after_steps(robots.y, robots.vy, steps, size.y)
+
+    if np is not None:
+        assert isinstance(x, np.ndarray) and isinstance(y, np.ndarray)
+        occupied = np.zeros(size.x * size.y, dtype=np.uint8)
+        occupied[y * size.x + x] = 1
+        packed = np.packbits(occupied, bitorder="little").tobytes()
+        return Frame(int.from_bytes(packed, "little"), size)
+
+    bits = 0
+    for cell in {y * size.x + x for x, y in zip(x, y)}:
+        bits |= 1 << cell
+
+    return Frame(bits, size)
+
+
+def score_spread(frame: Frame) -> int:
+    """Variance of the occupied cells on both axes, scaled to stay an integer"""
+
+    size = frame.size
+    count = frame.bits.bit_count()
+    row = (1 << size.x) - 1
+
+    spread = 0
+    for counts in (
+        [(frame.bits & column).bit_count() for column in get_column_masks(size)],
+        [(frame.bits >> y * size.x & row).bit_count() for y in range(size.y)],
+    ):
+        total = sum(i * cells for i, cells in enumerate(counts))
+        squares = sum(i * i * cells for i, cells in enumerate(counts))
+        spread += count * squares - total * total
+
+    return spread
+
+
+def score_compressed(frame: Frame) -> int:
+    """Bytes of the compressed bitmap, noise does not compress"""
+
+    size = frame.size
+    return len(zlib.compress(frame.bits.to_bytes((size.x * size.y + 7) // 8)))
+
 
+def score_scattered(frame: Frame) -> int:
+    """Occupied cells outside of the largest connected group"""
 
-def render_map(robots: list[Robot], size: Vector) -> str:
-    robot_positions: set[Position] = {robot.position for robot in robots}
+    size = frame.size
+    columns = get_column_masks(size)
+    not_first, not_last = ~columns[0], ~columns[-1]
 
-    string = ""
-    for i in range(size.y):
-        for j in range(size.x):
-            string += "#" if Vector(j, i) in robot_positions else "."
-        string += "\n"
+    def get_neighbours(cells: int) -> int:
+        return (
+            cells << 1 & not_first
+            | cells >> 1 & not_last
+            | cells << size.x
+            | cells >> size.x
+        )
 
-    return string
+    # Lone cells are groups of one, only the cells with a neighbour are grown
+    bits = frame.bits
+    remaining = bits & get_neighbours(bits)
+    largest = min(bits.bit_count(), 1)
+    while remaining:
+        # Grows the group of the lowest cell left, all its cells at once
+        group = remaining & -remaining
+        while True:
+            grown = group | remaining & get_neighbours(group)
+            if grown == group:
+                break
+            group = grown
+
+        largest = max(largest, group.bit_count())
+        remaining &= ~group
+
+    return bits.bit_count() - largest
+
+
+METRICS: dict[str, Metric] = {
+    "spread": score_spread,
+    "compressed": score_compressed,
+    "scattered": score_scattered,
+}
+
+
+def find_structured_steps(
+    robots: Robots, steps: range, metric: Metric, count: int
+) -> list[tuple[int, int]]:
+    """The count lowest scoring steps with their scores, frames repeat every
+    size.x * size.y steps, so no more than that many are scored"""
+
+    size = robots.size
+    steps = steps[: size.x * size.y]
+
+    return heapq.nsmallest(
+        count,
+        ((metric(pack_frame(robots, step)), step) for step in steps),
+    )
+
+
+def find_clustered_step(positions: Column, velocities: Column, size: int) -> int:
+    """Step within one period of an axis at which the robots spread the least"""
+
+    return min(
+        range(size),
+        key=lambda step: calculate_spread(
+            calculate_axis_after_steps(positions, velocities, step, size)
+        ),
+    )
+
+
+def chinese_remainder(remainders: Iterable[int], moduli: Iterable[int]) -> int:
+    """Smallest step with the given remainders, the moduli are pairwise coprime"""
+
+    step = 0
+    modulus = 1
+    for remainder, other_modulus in zip(remainders, moduli):
+        inverse = pow(modulus, -1, other_modulus)
+        step += modulus * ((remainder - step) * inverse % other_modulus)
+        modulus *= other_modulus
+
+    return step
+
+
+def find_tree(robots: Robots) -> int:
+    # The axes repeat every size.x and size.y steps, the tree clusters the robots
+    # on both axes at once
+    # https://www.reddit.com/r/adventofcode/comments/1hdw5op/comment/m1zfbgv
+    size = robots.size
+    x_step = find_clustered_step(robots.x, robots.vx, size.x)
+    y_step = find_clustered_step(robots.y, robots.vy, size.y)
+
+    return chinese_remainder((x_step, y_step), (size.x, size.y))
 
 
 def main() -> None:
-    lines = sys.stdin.readlines()
-    robots = parse_input(lines)
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--metric",
+        choices=METRICS,
+        help="score every frame with METRIC and print the best steps",
+    )
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--stop", type=int, default=101 * 103)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
 
+    lines = sys.stdin.readlines()
     size = Vector(101, 103)
+    robots = parse_input(lines, size)
 
-    # https://www.reddit.com/r/adventofcode/comments/1hdw5op/comment/m1zfbgv
-    for i in range(size.x * size.y):
-        for robot in robots:
-            robot.update_position(size)
-
-        # The tree will definitely be on a step c_1 + 101x_1 or c_2 + 103x_2
-        # if i % 103 == 32 or i % 101 == 83:
-        string = render_map(robots, size)
-        for line in string.split("\n"):
-            if line.find("###############################") != -1:
-                print(i + 1)
-                return
+    if args.metric:
+        metric = METRICS[args.metric]
+        steps = range(args.start, args.stop)
+        for score, step in find_structured_steps(robots, steps, metric, args.top):
+            print(step, score)
+        return
+
+    print(find_tree(robots))
 
 
 if __name__ == "__main__":
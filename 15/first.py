@@ -2,20 +2,20 @@
 
 from __future__ import annotations
 
+import argparse
 import sys
-from collections.abc import Iterable
+import zlib
+from array import array
+from collections.abc import Iterable, Sequence
 from dataclasses import dataclass
 from typing import Literal
 
 ROW_MULTIPLIER = 100
+SNAPSHOT_INTERVAL = 1000
 
-type Position = Vector
-
-type Empty = Literal["."]
-type Robot = Literal["@"]
-type Box = Literal["O"]
-type Wall = Literal["#"]
-type Map = list[list[Empty | Robot | Box | Wall]]
+type Position = int
+# Changed cells with their content before and after a command
+type Delta = tuple[Sequence[Position], bytes, bytes]
 
 type Up = Literal["^"]
 type Right = Literal[">"]
@@ -23,21 +23,148 @@ type Down = Literal["v"]
 type Left = Literal["<"]
 type Direction = Up | Right | Down | Left
 
+EMPTY = ord(".")
+ROBOT = ord("@")
+BOX = ord("O")
+WALL = ord("#")
 
-@dataclass(frozen=True)
-class Vector:
-    x: int
-    y: int
-
-    def __add__(self, other: Vector) -> Vector:
-        return Vector(self.x + other.x, self.y + other.y)
 
-    def __sub__(self, other: Vector) -> Vector:
-        return Vector(self.x - other.x, self.y - other.y)
+@dataclass
+class Warehouse:
+    """Row-major cells walled in on every side, the robot is tracked as it moves
+    instead of searched for"""
+
+    cells: bytearray
+    width: int
+    robot: Position
+
+    @staticmethod
+    def from_lines(lines: list[str]) -> Warehouse:
+        cells = bytearray("".join(line.strip() for line in lines).encode())
+        return Warehouse(cells, len(lines[0].strip()), cells.find(ROBOT))
+
+    def get_offset(self, command: Direction) -> int:
+        if command == "^":
+            return -self.width
+        if command == ">":
+            return 1
+        if command == "v":
+            return self.width
+        return -1
+
+    def perform_command(self, command: Direction) -> Delta | None:
+        """Returns the changed cells, None when the robot is blocked"""
+
+        cells = self.cells
+        offset = self.get_offset(command)
+        robot = self.robot
+
+        end = robot + offset
+        while cells[end] == BOX:
+            end += offset
+
+        if cells[end] == WALL:
+            return None
+
+        # The first box of the row lands in the gap, the robot takes its cell
+        changed = [robot, robot + offset]
+        if end != robot + offset:
+            changed.append(end)
+        old = bytes(cells[position] for position in changed)
+
+        cells[end] = BOX
+        cells[robot + offset] = ROBOT
+        cells[robot] = EMPTY
+        self.robot = robot + offset
+
+        return changed, old, bytes(cells[position] for position in changed)
+
+    def apply(self, positions: Sequence[Position], contents: bytes) -> None:
+        cells = self.cells
+        for position, c in zip(positions, contents):
+            cells[position] = c
+
+    def sum_boxes_coordinates(self) -> int:
+        count = 0
+
+        position = self.cells.find(BOX)
+        while position != -1:
+            y, x = divmod(position, self.width)
+            count += y * ROW_MULTIPLIER + x
+            position = self.cells.find(BOX, position + 1)
+
+        return count
+
+
+class Journal:
+    """Records the cells every command changes and a compressed snapshot every
+    `interval` commands, so the warehouse can jump to any recorded step"""
+
+    def __init__(self, warehouse: Warehouse, interval: int = SNAPSHOT_INTERVAL) -> None:
+        self.warehouse = warehouse
+        self.interval = interval
+        self.step = 0
+        self.deltas: list[Delta | None] = []
+        self.robots = array("q", [warehouse.robot])
+        self.snapshots = [zlib.compress(warehouse.cells, 1)]
+
+    def record(self, command: Direction) -> None:
+        """Performs the command after the current step, forgetting any steps
+        that followed it"""
+
+        if self.step < len(self.deltas):
+            del self.deltas[self.step :]
+            del self.robots[self.step + 1 :]
+            del self.snapshots[self.step // self.interval + 1 :]
+
+        self.deltas.append(self.warehouse.perform_command(command))
+        self.robots.append(self.warehouse.robot)
+        self.step += 1
+
+        if self.step % self.interval == 0:
+            self.snapshots.append(zlib.compress(self.warehouse.cells, 1))
+
+    def seek(self, step: int) -> None:
+        if not 0 <= step <= len(self.deltas):
+            raise IndexError(f"step {step} is not recorded")
+
+        # Restoring the snapshot costs a copy of the map, worth it when it saves
+        # walking through more commands
+        snapshot_step = step // self.interval * self.interval
+        if abs(step - self.step) > step - snapshot_step:
+            snapshot = zlib.decompress(self.snapshots[snapshot_step // self.interval])
+            self.warehouse.cells[:] = snapshot
+            self.step = snapshot_step
+
+        while self.step < step:
+            if delta := self.deltas[self.step]:
+                self.warehouse.apply(delta[0], delta[2])
+            self.step += 1
+
+        while self.step > step:
+            self.step -= 1
+            if delta := self.deltas[self.step]:
+                self.warehouse.apply(delta[0], delta[1])
+
+        self.warehouse.robot = self.robots[step]
+
+    def diff(self, first: int, second: int) -> dict[Position, tuple[int, int]]:
+        """Cells that differ between two steps with their content at each,
+        without moving the warehouse"""
 
+        start, stop = sorted((first, second))
 
-def parse_map(lines: Iterable[str]) -> Map:
-    return [list(line[:-1]) for line in lines]  # type: ignore[arg-type]
+        changes: dict[Position, tuple[int, int]] = {}
+        for delta in self.deltas[start:stop]:
+            if delta:
+                for position, old, new in zip(*delta):
+                    changes[position] = changes.get(position, (old, old))[0], new
+
+        return {
+            position: (old, new) if first <= second else (new, old)
+            for position, (old, new) in changes.items()
+            if old != new
+        }
 
 
 def parse_commands(lines: Iterable[str]) -> list[Direction]:
@@ -49,77 +176,53 @@ def parse_commands(lines: Iterable[str]) -> list[Direction]:
     return commands
 
 
-def parse_input(lines: list[str]) -> tuple[Map, list[Direction]]:
+def parse_input(lines: list[str]) -> tuple[Warehouse, list[Direction]]:
     i = lines.index("\n")
-    return parse_map(lines[:i]), parse_commands(lines[i + 1 :])
-
-
-def find_robot(robot_map) -> Position:
-    for i, row in enumerate(robot_map):
-        for j, el in enumerate(row):
-            if el == "@":
-                return Vector(j, i)
-
-    return Vector(-1, -1)
-
-
-def direction_to_vector(command: Direction) -> Vector:
-    if command == "^":
-        return Vector(0, -1)
-    if command == ">":
-        return Vector(1, 0)
-    if command == "v":
-        return Vector(0, 1)
-    if command == "<":
-        return Vector(-1, 0)
-
-
-def perform_command(robot_map: Map, command: Direction) -> None:
-    robot_position = find_robot(robot_map)
-    vector = direction_to_vector(command)
-
-    while True:
-        new_position = robot_position + vector
-        c = robot_map[new_position.y][new_position.x]
+    return Warehouse.from_lines(lines[:i]), parse_commands(lines[i + 1 :])
 
-        if c == ".":
-            while c != "@":
-                old_position = new_position - vector
-                c = robot_map[old_position.y][old_position.x]
-                robot_map[new_position.y][new_position.x] = c
-                new_position = old_position
 
-            robot_map[old_position.y][old_position.x] = "."
-            break
-
-        elif c == "#":
-            break
-
-        robot_position = new_position
-
-
-def perform_commands(robot_map: Map, commands: list[Direction]) -> None:
+def perform_commands(warehouse: Warehouse, commands: list[Direction]) -> None:
     for command in commands:
-        perform_command(robot_map, command)
+        warehouse.perform_command(command)
 
 
-def sum_boxes_coordinates(robot_map: Map) -> int:
-    count = 0
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--step",
+        type=int,
+        help="print the sum after STEP commands instead of all of them",
+    )
+    parser.add_argument(
+        "--diff",
+        type=int,
+        nargs=2,
+        metavar=("FIRST", "SECOND"),
+        help="print the cells that differ between two steps",
+    )
+    args = parser.parse_args()
 
-    for i, row in enumerate(robot_map):
-        for j, el in enumerate(row):
-            if el == "O":
-                count += i * 100 + j
+    lines = sys.stdin.readlines()
+    warehouse, commands = parse_input(lines)
 
-    return count
+    if args.step is None and args.diff is None:
+        perform_commands(warehouse, commands)
+        print(warehouse.sum_boxes_coordinates())
+        return
 
+    journal = Journal(warehouse)
+    for command in commands:
+        journal.record(command)
 
-def main() -> None:
-    lines = sys.stdin.readlines()
-    robot_map, commands = parse_input(lines)
-    perform_commands(robot_map, commands)
+    if args.diff:
+        changes = journal.diff(*args.diff)
+        for position, (old, new) in sorted(changes.items()):
+            y, x = divmod(position, warehouse.width)
+            print(x, y, chr(old), chr(new))
 
-    print(sum_boxes_coordinates(robot_map))
+    if args.step is not None:
+        journal.seek(args.step)
+        print(warehouse.sum_boxes_coordinates())
 
 
 if __name__ == "__main__":
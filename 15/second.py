@@ -2,22 +2,20 @@
 
 from __future__ import annotations
 
+import argparse
 import sys
-from collections.abc import Iterable
-from copy import deepcopy
+import zlib
+from array import array
+from collections.abc import Iterable, Sequence
 from dataclasses import dataclass
 from typing import Literal
 
 ROW_MULTIPLIER = 100
+SNAPSHOT_INTERVAL = 1000
 
-type Position = Vector
-
-type Empty = Literal["."]
-type Robot = Literal["@"]
-type BoxLeft = Literal["["]
-type BoxRight = Literal["]"]
-type Wall = Literal["#"]
-type Map = list[list[Empty | Robot | BoxLeft | BoxRight | Wall]]
+type Position = int
+# Changed cells with their content before and after a command
+type Delta = tuple[Sequence[Position], bytes, bytes]
 
 type Up = Literal["^"]
 type Right = Literal[">"]
@@ -25,182 +23,256 @@ type Down = Literal["v"]
 type Left = Literal["<"]
 type Direction = Up | Right | Down | Left
 
+EMPTY = ord(".")
+ROBOT = ord("@")
+BOX_LEFT = ord("[")
+BOX_RIGHT = ord("]")
+WALL = ord("#")
+
+WIDENED = {"#": "##", "O": "[]", "@": "@.", ".": ".."}
+
+
+@dataclass
+class Warehouse:
+    """Row-major cells walled in on every side, the robot is tracked as it moves
+    instead of searched for"""
+
+    cells: bytearray
+    width: int
+    robot: Position
+
+    @staticmethod
+    def from_lines(lines: list[str]) -> Warehouse:
+        cells = bytearray(
+            "".join(WIDENED[c] for line in lines for c in line.strip()).encode()
+        )
+        return Warehouse(cells, 2 * len(lines[0].strip()), cells.find(ROBOT))
+
+    def get_offset(self, command: Direction) -> int:
+        if command == "^":
+            return -self.width
+        if command == ">":
+            return 1
+        if command == "v":
+            return self.width
+        return -1
+
+    def push_horizontal(self, offset: int) -> Delta | None:
+        cells = self.cells
+        robot = self.robot
+
+        end = robot + offset
+        while cells[end] == BOX_LEFT or cells[end] == BOX_RIGHT:
+            end += offset
+
+        if cells[end] == WALL:
+            return None
+
+        start, stop = min(robot, end), max(robot, end) + 1
+        old = bytes(cells[start:stop])
+
+        # Everything between the robot and the gap shifts by one cell
+        if offset == 1:
+            cells[robot + 1 : end + 1] = cells[robot:end]
+        else:
+            cells[end:robot] = cells[end + 1 : robot + 1]
+        cells[robot] = EMPTY
+
+        return range(start, stop), old, bytes(cells[start:stop])
+
+    def push_vertical(self, offset: int) -> Delta | None:
+        cells = self.cells
+
+        # Breadth first, so every cell is found before the cells it pushes into
+        pushed = [self.robot]
+        seen = {self.robot}
+        for position in pushed:
+            new_position = position + offset
+            c = cells[new_position]
+
+            if c == WALL:
+                return None
+
+            if c == BOX_LEFT:
+                halves: tuple[Position, ...] = (new_position, new_position + 1)
+            elif c == BOX_RIGHT:
+                halves = (new_position, new_position - 1)
+            else:
+                continue
 
-@dataclass(frozen=True)
-class Vector:
-    x: int
-    y: int
-
-    def __add__(self, other: Vector) -> Vector:
-        return Vector(self.x + other.x, self.y + other.y)
-
-    def __sub__(self, other: Vector) -> Vector:
-        return Vector(self.x - other.x, self.y - other.y)
-
-
-def parse_map(lines: Iterable[str]) -> Map:
-    robot_map: Map = []
-
-    for line in lines:
-        robot_map.append([])
-        for c in line:
-            if c == "#":
-                robot_map[-1].extend(["#", "#"])
-            elif c == "O":
-                robot_map[-1].extend(["[", "]"])
-            elif c == "@":
-                robot_map[-1].extend(["@", "."])
-            elif c == ".":
-                robot_map[-1].extend([".", "."])
-
-    return robot_map  # type: ignore[arg-type]
-
+            for half in halves:
+                if half not in seen:
+                    seen.add(half)
+                    pushed.append(half)
 
-def parse_commands(lines: Iterable[str]) -> list[Direction]:
-    commands: list[Direction] = []
-
-    for line in lines:
-        commands.extend(line[:-1])  # type: ignore[arg-type]
+        changed = [*seen.union(position + offset for position in pushed)]
+        old = bytes(cells[position] for position in changed)
 
-    return commands
+        for position in reversed(pushed):
+            cells[position + offset] = cells[position]
+            cells[position] = EMPTY
 
+        return changed, old, bytes(cells[position] for position in changed)
 
-def parse_input(lines: list[str]) -> tuple[Map, list[Direction]]:
-    i = lines.index("\n")
-    return parse_map(lines[:i]), parse_commands(lines[i + 1 :])
+    def perform_command(self, command: Direction) -> Delta | None:
+        """Returns the changed cells, None when the robot is blocked"""
 
+        offset = self.get_offset(command)
 
-def find_robot(robot_map) -> Position:
-    for i, row in enumerate(robot_map):
-        for j, el in enumerate(row):
-            if el == "@":
-                return Vector(j, i)
+        if abs(offset) == 1:
+            delta = self.push_horizontal(offset)
+        else:
+            delta = self.push_vertical(offset)
 
-    return Vector(-1, -1)
+        if delta:
+            self.robot += offset
 
+        return delta
 
-def direction_to_vector(command: Direction) -> Vector:
-    if command == "^":
-        return Vector(0, -1)
-    if command == ">":
-        return Vector(1, 0)
-    if command == "v":
-        return Vector(0, 1)
-    if command == "<":
-        return Vector(-1, 0)
+    def apply(self, positions: Sequence[Position], contents: bytes) -> None:
+        cells = self.cells
+        for position, c in zip(positions, contents):
+            cells[position] = c
 
+    def sum_boxes_coordinates(self) -> int:
+        count = 0
 
-def is_horizontal(movement: Vector) -> bool:
-    return movement.y == 0 and movement.x != 0
+        position = self.cells.find(BOX_LEFT)
+        while position != -1:
+            y, x = divmod(position, self.width)
+            count += y * ROW_MULTIPLIER + x
+            position = self.cells.find(BOX_LEFT, position + 1)
 
+        return count
 
-def perform_horizontal(position: Position, robot_map: Map, direction: Vector) -> bool:
-    c = robot_map[position.y][position.x]
 
-    if c == "#":
-        return False
+class Journal:
+    """Records the cells every command changes and a compressed snapshot every
+    `interval` commands, so the warehouse can jump to any recorded step"""
 
-    if c == ".":
-        return True
+    def __init__(self, warehouse: Warehouse, interval: int = SNAPSHOT_INTERVAL) -> None:
+        self.warehouse = warehouse
+        self.interval = interval
+        self.step = 0
+        self.deltas: list[Delta | None] = []
+        self.robots = array("q", [warehouse.robot])
+        self.snapshots = [zlib.compress(warehouse.cells, 1)]
 
-    new_position = position + direction
-    is_valid = perform_horizontal(new_position, robot_map, direction)
-    if is_valid:
-        robot_map[new_position.y][new_position.x] = c
+    def record(self, command: Direction) -> None:
+        """Performs the command after the current step, forgetting any steps
+        that followed it"""
 
-    return is_valid
+        if self.step < len(self.deltas):
+            del self.deltas[self.step :]
+            del self.robots[self.step + 1 :]
+            del self.snapshots[self.step // self.interval + 1 :]
 
+        self.deltas.append(self.warehouse.perform_command(command))
+        self.robots.append(self.warehouse.robot)
+        self.step += 1
 
-def validate_vertical(
-    position: Position,
-    robot_map: Map,
-    direction: Vector,
-    visited: set[Position],
-) -> bool:
-    c = robot_map[position.y][position.x]
+        if self.step % self.interval == 0:
+            self.snapshots.append(zlib.compress(self.warehouse.cells, 1))
 
-    if c == "#":
-        return False
+    def seek(self, step: int) -> None:
+        if not 0 <= step <= len(self.deltas):
+            raise IndexError(f"step {step} is not recorded")
 
-    if c == ".":
-        return True
+        # Restoring the snapshot costs a copy of the map, worth it when it saves
+        # walking through more commands
+        snapshot_step = step // self.interval * self.interval
+        if abs(step - self.step) > step - snapshot_step:
+            snapshot = zlib.decompress(self.snapshots[snapshot_step // self.interval])
+            self.warehouse.cells[:] = snapshot
+            self.step = snapshot_step
 
-    new_position = position + direction
-    new_c = robot_map[new_position.y][new_position.x]
-    visited.add(new_position)
+        while self.step < step:
+            if delta := self.deltas[self.step]:
+                self.warehouse.apply(delta[0], delta[2])
+            self.step += 1
 
-    if c == "@" or c == "]":
-        if new_c == "[":
-            shifted_position = new_position + Vector(1, 0)
-            visited.add(shifted_position)
-            return validate_vertical(
-                new_position, robot_map, direction, visited
-            ) and validate_vertical(shifted_position, robot_map, direction, visited)
+        while self.step > step:
+            self.step -= 1
+            if delta := self.deltas[self.step]:
+                self.warehouse.apply(delta[0], delta[1])
 
-    if c == "@" or c == "[":
-        if new_c == "]":
-            shifted_position = new_position - Vector(1, 0)
-            visited.add(shifted_position)
-            return validate_vertical(
-                new_position, robot_map, direction, visited
-            ) and validate_vertical(shifted_position, robot_map, direction, visited)
+        self.warehouse.robot = self.robots[step]
 
-    return validate_vertical(new_position, robot_map, direction, visited)
+    def diff(self, first: int, second: int) -> dict[Position, tuple[int, int]]:
+        """Cells that differ between two steps with their content at each,
+        without moving the warehouse"""
 
+        start, stop = sorted((first, second))
 
-def perform_vertical(position: Position, robot_map: Map, direction: Vector) -> bool:
-    old_map = deepcopy(robot_map)
-    visited: set[Position] = {position}
-    if is_valid := validate_vertical(position, robot_map, direction, visited):
-        for node_position in visited:
-            if (old_position := (node_position - direction)) in visited:
-                character = old_map[old_position.y][old_position.x]
-            else:
-                character = "."
+        changes: dict[Position, tuple[int, int]] = {}
+        for delta in self.deltas[start:stop]:
+            if delta:
+                for position, old, new in zip(*delta):
+                    changes[position] = changes.get(position, (old, old))[0], new
 
-            robot_map[node_position.y][node_position.x] = character
+        return {
+            position: (old, new) if first <= second else (new, old)
+            for position, (old, new) in changes.items()
+            if old != new
+        }
 
-    return is_valid
 
+def parse_commands(lines: Iterable[str]) -> list[Direction]:
+    commands: list[Direction] = []
 
-def perform_command_util(position: Position, robot_map: Map, direction: Vector) -> bool:
-    if is_horizontal(direction):
-        return perform_horizontal(position, robot_map, direction)
-    else:
-        return perform_vertical(position, robot_map, direction)
+    for line in lines:
+        commands.extend(line[:-1])  # type: ignore[arg-type]
 
+    return commands
 
-def perform_command(robot_map: Map, command: Direction) -> None:
-    robot_position = find_robot(robot_map)
-    direction_vector = direction_to_vector(command)
 
-    if perform_command_util(robot_position, robot_map, direction_vector):
-        robot_map[robot_position.y][robot_position.x] = "."
+def parse_input(lines: list[str]) -> tuple[Warehouse, list[Direction]]:
+    i = lines.index("\n")
+    return Warehouse.from_lines(lines[:i]), parse_commands(lines[i + 1 :])
 
 
-def perform_commands(robot_map: Map, commands: list[Direction]) -> None:
+def perform_commands(warehouse: Warehouse, commands: list[Direction]) -> None:
     for command in commands:
-        perform_command(robot_map, command)
-
+        warehouse.perform_command(command)
 
-def sum_boxes_coordinates(robot_map: Map) -> int:
-    count = 0
 
-    for i, row in enumerate(robot_map):
-        for j, el in enumerate(row):
-            if el == "[":
-                count += i * 100 + j
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--step",
+        type=int,
+        help="print the sum after STEP commands instead of all of them",
+    )
+    parser.add_argument(
+        "--diff",
+        type=int,
+        nargs=2,
+        metavar=("FIRST", "SECOND"),
+        help="print the cells that differ between two steps",
+    )
+    args = parser.parse_args()
 
-    return count
+    lines = sys.stdin.readlines()
+    warehouse, commands = parse_input(lines)
 
+    if args.step is None and args.diff is None:
+        perform_commands(warehouse, commands)
+        print(warehouse.sum_boxes_coordinates())
+        return
 
-def main() -> None:
-    lines = sys.stdin.readlines()
-    robot_map, commands = parse_input(lines)
+    journal = Journal(warehouse)
+    for command in commands:
+        journal.record(command)
 
-    perform_commands(robot_map, commands)
+    if args.diff:
+        changes = journal.diff(*args.diff)
+        for position, (old, new) in sorted(changes.items()):
+            y, x = divmod(position, warehouse.width)
+            print(x, y, chr(old), chr(new))
 
-    print(sum_boxes_coordinates(robot_map))
+    if args.step is not None:
+        journal.seek(args.step)
+        print(warehouse.sum_boxes_coordinates())
 
 
 if __name__ == "__main__":
@@ -1,87 +1,117 @@
 #!/usr/bin/env python3
 
 import sys
+from functools import cache
 from typing import Callable
 
+type Runner = Callable[[int, int, int], tuple[list[int], int, int, int]]
 
-class Program:
-    A: int
-    B: int
-    C: int
+JNZ = 3
 
-    instructions: list[int]
-    program_output: list[int]
+# Combo operand 7 is reserved and never appears in valid programs
+COMBO_OPERANDS = ("0", "1", "2", "3", "A", "B", "C")
 
-    IP: int = 0
+# Divisions by a power of two are shifts, exact for any size of A, jnz has no
+# statement of its own
+OPERATIONS = (
+    "A >>= {combo}",
+    "B ^= {literal}",
+    "B = {combo} & 7",
+    "",
+    "B ^= C",
+    "append({combo} & 7)",
+    "B = A >> {combo}",
+    "C = A >> {combo}",
+)
 
-    def __init__(self, A: int, B: int, C: int, instructions: list[int]) -> None:
-        self.A = A
-        self.B = B
-        self.C = C
-        self.instructions = instructions
-        self.program_output = []
 
-    def __get_operand(self, operand: int):
-        # According to tests, combo 7 is literal 7
-        operands = [0, 1, 2, 3, self.A, self.B, self.C]
-        return operands[operand]
+def generate_statement(opcode: int, operand: int) -> str:
+    if opcode == JNZ:
+        raise ValueError("jnz is compiled into the dispatch, not a statement")
+
+    operation = OPERATIONS[opcode]
+    if operand >= len(COMBO_OPERANDS):
+        if "{combo}" in operation:
+            return 'raise ValueError("combo operand 7 is reserved")'
+        combo = ""
+    else:
+        combo = COMBO_OPERANDS[operand]
+
+    return operation.format(combo=combo, literal=operand)
 
-    def __adv(self, value: int) -> None:
-        self.A = int(self.A / (2**value))
 
-    def __bxl(self, value: int) -> None:
-        self.B = self.B ^ value
+@cache
+def compile_program(instructions: tuple[int, ...]) -> Runner:
+    """Translates the program into a single Python function, one block of
+    straight-line code for every jump target, dispatched on the instruction
+    pointer only after a jump"""
 
-    def __bst(self, value: int) -> None:
-        self.B = value % 8
+    # An opcode in the last cell has no operand and halts the program
+    end = len(instructions) - 1
 
-    def __jnz(self, value: int) -> None:
-        if self.A != 0:
-            self.IP = value - 2
+    labels = {0}
+    for ip in range(end):
+        if instructions[ip] == JNZ:
+            labels.update((instructions[ip + 1], ip + 2))
 
-    def __bxc(self, _: int) -> None:
-        self.B = self.B ^ self.C
+    lines = [
+        "def run(A, B, C):",
+        "    output = []",
+        "    append = output.append",
+        "    ip = 0",
+        "    while True:",
+    ]
 
-    def __out(self, value: int) -> None:
-        self.program_output.append(value % 8)
+    for label in sorted(labels):
+        if label >= end:
+            continue
 
-    def __bdv(self, value: int) -> None:
-        self.B = int(self.A / (2**value))
+        lines.append(f"        if ip == {label}:")
+        ip = label
+        while ip < end:
+            opcode, operand = instructions[ip], instructions[ip + 1]
+            ip += 2
+            if opcode == JNZ:
+                lines += [
+                    "            if A:",
+                    f"                ip = {operand}",
+                    "                continue",
+                ]
+                break
 
-    def __cdv(self, value: int) -> None:
-        self.C = int(self.A / (2**value))
+            lines.append(f"            {generate_statement(opcode, operand)}")
+            if ip in labels:
+                break
 
-    def __process_instruction(self) -> bool:
-        """Processes next instruction and returns whether the program has halted.
+        # Falls through into the block of the next label
+        lines.append(f"            ip = {ip}")
 
-        :return: Has program halted
-        :rtype: bool
-        """
-        if self.IP < 0 or self.IP >= len(self.instructions):
-            return True
+    lines.append("        return output, A, B, C")
 
-        instruction = self.instructions[self.IP]
-        combo_operand = self.__get_operand(self.instructions[self.IP + 1])
+    namespace: dict[str, Runner] = {}
+    exec("\n".join(lines), namespace)
 
-        instructions: list[Callable[[int], None]] = [
-            self.__adv,
-            self.__bxl,
-            self.__bst,
-            self.__jnz,
-            self.__bxc,
-            self.__out,
-            self.__bdv,
-            self.__cdv,
-        ]
+    return namespace["run"]
 
-        instructions[instruction](combo_operand)
-        self.IP += 2
 
-        return False
+class Program:
+    A: int
+    B: int
+    C: int
+
+    instructions: list[int]
+    program_output: list[int]
+
+    def __init__(self, A: int, B: int, C: int, instructions: list[int]) -> None:
+        self.A = A
+        self.B = B
+        self.C = C
+        self.instructions = instructions
+        self.program_output = []
 
     def process_program(self) -> None:
-        while not self.__process_instruction():
-            pass
+        run = compile_program(tuple(self.instructions))
+        self.program_output, self.A, self.B, self.C = run(self.A, self.B, self.C)
         print(",".join(map(str, self.program_output)))
 
 
@@ -1,113 +1,169 @@
 #!/usr/bin/env python3
 
 import sys
+from functools import cache
 from typing import Callable
 
+type Runner = Callable[[int, int, int], tuple[list[int], int, int, int]]
+
+ADV = 0
+JNZ = 3
+OUT = 5
+
+# Registers every opcode reads besides its combo operand and the ones it writes
+READS = ("A", "B", "", "A", "BC", "", "A", "A")
+WRITES = ("A", "B", "B", "", "B", "", "B", "C")
+LITERAL_OPCODES = {1, 3, 4}
+
+# Combo operand 7 is reserved and never appears in valid programs
+COMBO_OPERANDS = ("0", "1", "2", "3", "A", "B", "C")
+
+# Divisions by a power of two are shifts, exact for any size of A, jnz has no
+# statement of its own
+OPERATIONS = (
+    "A >>= {combo}",
+    "B ^= {literal}",
+    "B = {combo} & 7",
+    "",
+    "B ^= C",
+    "append({combo} & 7)",
+    "B = A >> {combo}",
+    "C = A >> {combo}",
+)
+
+
+def generate_statement(opcode: int, operand: int) -> str:
+    if opcode == JNZ:
+        raise ValueError("jnz is compiled into the dispatch, not a statement")
+
+    operation = OPERATIONS[opcode]
+    if operand >= len(COMBO_OPERANDS):
+        if "{combo}" in operation:
+            return 'raise ValueError("combo operand 7 is reserved")'
+        combo = ""
+    else:
+        combo = COMBO_OPERANDS[operand]
+
+    return operation.format(combo=combo, literal=operand)
+
+
+@cache
+def compile_program(instructions: tuple[int, ...]) -> Runner:
+    """Translates the program into a single Python function, one block of
+    straight-line code for every jump target, dispatched on the instruction
+    pointer only after a jump"""
+
+    # An opcode in the last cell has no operand and halts the program
+    end = len(instructions) - 1
+
+    labels = {0}
+    for ip in range(end):
+        if instructions[ip] == JNZ:
+            labels.update((instructions[ip + 1], ip + 2))
+
+    lines = [
+        "def run(A, B, C):",
+        "    output = []",
+        "    append = output.append",
+        "    ip = 0",
+        "    while True:",
+    ]
+
+    for label in sorted(labels):
+        if label >= end:
+            continue
+
+        lines.append(f"        if ip == {label}:")
+        ip = label
+        while ip < end:
+            opcode, operand = instructions[ip], instructions[ip + 1]
+            ip += 2
+            if opcode == JNZ:
+                lines += [
+                    "            if A:",
+                    f"                ip = {operand}",
+                    "                continue",
+                ]
+                break
+
+            lines.append(f"            {generate_statement(opcode, operand)}")
+            if ip in labels:
+                break
+
+        # Falls through into the block of the next label
+        lines.append(f"            ip = {ip}")
+
+    lines.append("        return output, A, B, C")
+
+    namespace: dict[str, Runner] = {}
+    exec("\n".join(lines), namespace)
+
+    return namespace["run"]
 
-class Program:
-    A: int
-    B: int
-    C: int
 
-    instructions: list[int]
-    program_output: list[int]
-
-    IP: int = 0
-
-    def __init__(self, A: int, B: int, C: int, instructions: list[int]) -> None:
-        self.A = A
-        self.B = B
-        self.C = C
-        self.instructions = instructions
-        self.program_output = []
-
-    def __get_operand(self, operand: int):
-        operands = [0, 1, 2, 3, self.A, self.B, self.C]
-        return operands[operand]
-
-    def __adv(self, value: int) -> None:
-        self.A = int(self.A / (2**value))
-
-    def __bxl(self, value: int) -> None:
-        self.B = self.B ^ value
-
-    def __bst(self, value: int) -> None:
-        self.B = value % 8
-
-    def __jnz(self, value: int) -> None:
-        if self.A != 0:
-            self.IP = value - 2
-
-    def __bxc(self, _: int) -> None:
-        self.B = self.B ^ self.C
-
-    def __out(self, value: int) -> None:
-        self.program_output.append(value % 8)
-
-    def __bdv(self, value: int) -> None:
-        self.B = int(self.A / (2**value))
+def parse_program_input(lines: list[str]) -> tuple[int, int, list[int]]:
+    _, B = lines[1].split(":")
+    _, C = lines[2].split(":")
 
-    def __cdv(self, value: int) -> None:
-        self.C = int(self.A / (2**value))
+    _, instructions = lines[4].split(" ")
+    parsed_instructions = [int(i) for i in instructions.split(",")]
 
-    def __process_instruction(self) -> bool:
-        """Processes next instruction and returns whether the program has halted.
+    return int(B), int(C), parsed_instructions
 
-        :return: Has program halted
-        :rtype: bool
-        """
-        if self.IP < 0 or self.IP >= len(self.instructions):
-            return True
 
-        instruction = self.instructions[self.IP]
-        combo_operand = self.__get_operand(self.instructions[self.IP + 1])
+def check_loop(instructions: list[int]) -> list[int]:
+    """Returns the body of a program that loops back to the start from its end,
+    shifts A by 3, outputs one value and sets B and C before reading them in
+    every loop, so each output depends only on the A of its own loop"""
 
-        instructions: list[Callable[[int], None]] = [
-            self.__adv,
-            self.__bxl,
-            self.__bst,
-            self.__jnz,
-            self.__bxc,
-            self.__out,
-            self.__bdv,
-            self.__cdv,
-        ]
+    if len(instructions) % 2 or instructions[-2:] != [JNZ, 0]:
+        raise ValueError("program does not end with a jump to the start")
 
-        instructions[instruction](combo_operand)
-        self.IP += 2
+    body = instructions[:-2]
+    opcodes = body[::2]
+    if JNZ in opcodes:
+        raise ValueError("program jumps inside of its loop")
+    if opcodes.count(ADV) != 1 or body[opcodes.index(ADV) * 2 + 1] != 3:
+        raise ValueError("program does not shift A by 3 once every loop")
+    if opcodes.count(OUT) != 1:
+        raise ValueError("program does not output once every loop")
 
-        return False
+    written: set[str] = set()
+    for opcode, operand in zip(opcodes, body[1::2]):
+        read = set(READS[opcode])
+        if opcode not in LITERAL_OPCODES and operand < len(COMBO_OPERANDS):
+            read.add(COMBO_OPERANDS[operand])
 
-    def process_program(self) -> None:
-        while not self.__process_instruction():
-            pass
+        if read & {"B", "C"} - written:
+            raise ValueError("program carries B or C between loops")
 
+        written.update(WRITES[opcode])
 
-def parse_program_input(lines: list[str]) -> tuple[int, int, list[int]]:
-    _, B = lines[1].split(":")
-    _, C = lines[2].split(":")
+    return body
 
-    _, instructions = lines[4].split(" ")
-    parsed_instructions = [int(i) for i in instructions.split(",")]
 
-    return int(B), int(C), parsed_instructions
+def find_a(B: int, C: int, instructions: list[int]) -> int:
+    """Lowest A that makes the program output itself, 0 if there is none
 
+    The last loop sees only the highest 3 bits of A, every loop before it sees
+    3 more. So the valid prefixes of A are built from the last output back,
+    all of them kept level by level, each candidate running a single loop.
+    """
 
-def find_a(B: int, C: int, instructions: list[int], A: int = 0, depth: int = 0) -> int:
     # https://www.reddit.com/r/adventofcode/comments/1hg38ah/comment/m2gliho
-    if depth == len(instructions):
-        return A
-
-    for i in range(8):
-        next_a = A * 8 + i
-        program = Program(next_a, B, C, instructions)
-        program.process_program()
-
-        if program.program_output[0] == instructions[len(instructions) - (depth + 1)]:
-            if result := find_a(B, C, instructions, next_a, depth + 1):
-                return result
+    run_loop = compile_program(tuple(check_loop(instructions)))
+
+    prefixes = [0]
+    for expected in reversed(instructions):
+        # A never starts the last loop as 0, it would have halted a loop earlier
+        prefixes = [
+            A
+            for prefix in prefixes
+            for A in range(prefix * 8, prefix * 8 + 8)
+            if A and run_loop(A, B, C)[0] == [expected]
+        ]
 
-    return 0
+    return min(prefixes, default=0)
 
 
 def main() -> None:
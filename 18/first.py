@@ -2,114 +2,59 @@
 
 from __future__ import annotations
 
+import argparse
 import sys
-from collections import deque
-from collections.abc import Iterable
-from dataclasses import dataclass
-from typing import Literal
+from collections.abc import Iterable, Iterator
+from itertools import islice
+from pathlib import Path
 
-type Position = Vector
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-type Empty = Literal["."]
-type Wall = Literal["#"]
-type Map = list[list[Empty | Wall]]
-
-
-@dataclass(frozen=True)
-class Vector:
-    x: int
-    y: int
-
-    def __add__(self, other: Vector) -> Vector:
-        return Vector(self.x + other.x, self.y + other.y)
-
-    def __sub__(self, other: Vector) -> Vector:
-        return Vector(self.x - other.x, self.y - other.y)
+from grid import WALL, Grid, bfs_distance  # noqa: E402
 
+type Position = tuple[int, int]
 
 WIDTH = 71
 HEIGHT = 71
 BLOCK_COUNT = 1024
 
 
-def parse_blocks(lines: Iterable[str]) -> set[Position]:
-    positions: set[Position] = set()
-
+def parse_blocks(lines: Iterable[str]) -> Iterator[Position]:
     for line in lines:
         x, y = line.split(",")
-        positions.add(Vector(int(x), int(y)))
-
-    return positions
-
-
-def create_map(x: int, y: int, blocks: set[Position]) -> Map:
-    blocked_map: Map = []
-
-    for i in range(y):
-        blocked_map.append([])
-
-        for j in range(x):
-            if Vector(j, i) in blocks:
-                blocked_map[-1].append("#")
-            else:
-                blocked_map[-1].append(".")
-
-    return blocked_map
-
-
-def get_valid_nearby_positions(block_map: Map, position: Position) -> list[Position]:
-    new_positions = []
-
-    for new_position in [
-        position + v for v in [Vector(0, -1), Vector(1, 0), Vector(0, 1), Vector(-1, 0)]
-    ]:
-        if (
-            new_position.x >= 0
-            and new_position.x < len(block_map[0])
-            and new_position.y >= 0
-            and new_position.y < len(block_map)
-            and block_map[new_position.y][new_position.x] != "#"
-        ):
-            new_positions.append(new_position)
-
-    return new_positions
-
-
-def find_exit(
-    block_map: Map,
-    position: Position = Vector(0, 0),
-    end: Position = Vector(WIDTH - 1, HEIGHT - 1),
-) -> int:
-    visited: set[Position] = set()
-
-    to_be_visited: deque[tuple[Position, int]] = deque()
-    to_be_visited.append((position, 0))
+        yield int(x), int(y)
 
-    while len(to_be_visited) != 0:
-        current_position, distance = to_be_visited.popleft()
 
-        if current_position in visited:
-            continue
+def create_map(width: int, height: int, blocks: Iterable[Position]) -> Grid:
+    block_map = Grid.empty(width, height)
+    for x, y in blocks:
+        block_map.cells[block_map.cell(x, y)] = WALL
 
-        visited.add(current_position)
+    return block_map
 
-        if current_position == end:
-            return distance
 
-        to_be_visited.extend(
-            [
-                (p, distance + 1)
-                for p in get_valid_nearby_positions(block_map, current_position)
-            ]
-        )
+def find_exit(block_map: Grid) -> int:
+    start = block_map.cell(0, 0)
+    end = block_map.cell(block_map.width - 3, block_map.height - 3)
 
-    return -1
+    return bfs_distance(block_map, start, end)
 
 
 def main() -> None:
-    lines = sys.stdin.readlines()
-    blocks = parse_blocks(lines[:BLOCK_COUNT])
-    block_map = create_map(WIDTH, HEIGHT, blocks)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=WIDTH)
+    parser.add_argument("--height", type=int, default=HEIGHT)
+    parser.add_argument(
+        "--bytes",
+        type=int,
+        default=BLOCK_COUNT,
+        help="number of bytes fallen before the walk",
+    )
+    args = parser.parse_args()
+
+    # Bytes are read as they are placed, large maps never hold the whole input
+    blocks = parse_blocks(islice(sys.stdin, args.bytes))
+    block_map = create_map(args.width, args.height, blocks)
 
     print(find_exit(block_map))
 
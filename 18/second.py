@@ -2,30 +2,18 @@
 
 from __future__ import annotations
 
+import argparse
 import sys
-from collections import deque
-from collections.abc import Iterable
-from dataclasses import dataclass
-from typing import Literal
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable, Sequence
+from pathlib import Path
 
-type Position = Vector
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-type Empty = Literal["."]
-type Wall = Literal["#"]
-type Map = list[list[Empty | Wall]]
-
-
-@dataclass(frozen=True)
-class Vector:
-    x: int
-    y: int
-
-    def __add__(self, other: Vector) -> Vector:
-        return Vector(self.x + other.x, self.y + other.y)
-
-    def __sub__(self, other: Vector) -> Vector:
-        return Vector(self.x - other.x, self.y - other.y)
+from grid import EMPTY, UNREACHED, WALL, Cell, Grid, bfs_distance  # noqa: E402
 
+type Position = tuple[int, int]
 
 WIDTH = 71
 HEIGHT = 71
@@ -36,85 +24,124 @@ def parse_blocks(lines: Iterable[str]) -> list[Position]:
 
     for line in lines:
         x, y = line.split(",")
-        positions.append(Vector(int(x), int(y)))
+        positions.append((int(x), int(y)))
 
     return positions
 
 
-def create_map(x: int, y: int) -> Map:
-    blocked_map: Map = []
+def find_exit(block_map: Grid) -> int:
+    start = block_map.cell(0, 0)
+    end = block_map.cell(block_map.width - 3, block_map.height - 3)
+
+    return bfs_distance(block_map, start, end)
+
 
-    for _ in range(y):
-        blocked_map.append(["." for _ in range(x)])
+def find_first_invalid(width: int, height: int, blocks: Sequence[Position]) -> Position:
+    """Drops every byte first and lifts them again from the last one, keeping
+    the open cells joined in a union-find, the byte whose lifting connects the
+    start with the exit is the first one to cut them apart"""
 
-    return blocked_map
+    block_map = Grid.empty(width, height)
+    cells = block_map.cells
+    start = block_map.cell(0, 0)
+    end = block_map.cell(width - 1, height - 1)
 
+    drops = [block_map.cell(x, y) for x, y in blocks]
+    first_drops = array("i", [len(drops)]) * len(cells)
+    for i in reversed(range(len(drops))):
+        first_drops[drops[i]] = i
+        cells[drops[i]] = WALL
 
-def get_valid_nearby_positions(block_map: Map, position: Position) -> list[Position]:
-    new_positions = []
+    # A byte falling onto the start does not matter, the walk is already there
+    cells[start] = EMPTY
 
-    for new_position in [
-        position + v for v in [Vector(0, -1), Vector(1, 0), Vector(0, 1), Vector(-1, 0)]
-    ]:
-        if (
-            new_position.x >= 0
-            and new_position.x < len(block_map[0])
-            and new_position.y >= 0
-            and new_position.y < len(block_map)
-            and block_map[new_position.y][new_position.x] != "#"
-        ):
-            new_positions.append(new_position)
+    parents = array("i", range(len(cells)))
 
-    return new_positions
+    def find(cell: Cell) -> Cell:
+        while parents[cell] != cell:
+            parents[cell] = parents[parents[cell]]
+            cell = parents[cell]
 
+        return cell
 
-def find_exit(
-    block_map: Map,
-    position: Position = Vector(0, 0),
-    end: Position = Vector(WIDTH - 1, HEIGHT - 1),
-) -> int:
-    visited: set[Position] = set()
+    def join(cell: Cell, neighbours: Iterable[Cell]) -> Cell:
+        root = find(cell)
+        for neighbour in neighbours:
+            if cells[neighbour] != WALL:
+                parents[find(neighbour)] = root
 
-    to_be_visited: deque[tuple[Position, int]] = deque()
-    to_be_visited.append((position, 0))
+        return root
 
-    while len(to_be_visited) != 0:
-        current_position, distance = to_be_visited.popleft()
+    # Joining every cell with the one to the right and below covers all pairs
+    for cell in range(len(cells)):
+        if cells[cell] != WALL:
+            join(cell, (cell + 1, cell + block_map.width))
 
-        if current_position in visited:
+    if find(start) == find(end):
+        raise ValueError("the exit is never cut off")
+
+    for i in reversed(range(len(drops))):
+        cell = drops[i]
+        # Only the first drop onto a cell turns it into a wall
+        if first_drops[cell] != i or cell == start:
             continue
 
-        visited.add(current_position)
+        cells[cell] = EMPTY
+        root = join(cell, [cell + offset for offset in block_map.offsets])
+        if find(start) == root == find(end):
+            return blocks[i]
+
+    raise ValueError("the exit is never reachable")
+
 
-        if current_position == end:
-            return distance
+def find_first_invalid_bisect(
+    width: int, height: int, blocks: Sequence[Position]
+) -> Position:
+    """Binary search for the shortest prefix of the bytes that cuts the exit
+    off, a BFS on a fresh map for every probe"""
 
-        to_be_visited.extend(
-            [
-                (p, distance + 1)
-                for p in get_valid_nearby_positions(block_map, current_position)
-            ]
-        )
+    empty_map = Grid.empty(width, height)
+    drops = [empty_map.cell(x, y) for x, y in blocks]
 
-    return -1
+    def is_cut(count: int) -> bool:
+        block_map = Grid(empty_map.cells.copy(), empty_map.width, empty_map.height)
+        for cell in drops[:count]:
+            block_map.cells[cell] = WALL
 
+        return find_exit(block_map) == UNREACHED
 
-def find_first_invalid(width: int, height: int, blocks: Iterable[Position]) -> Position:
-    block_map = create_map(width, height)
+    count = bisect_left(range(len(drops) + 1), True, key=is_cut)
+    if count > len(drops):
+        raise ValueError("the exit is never cut off")
 
-    block_iterator = iter(blocks)
-    while find_exit(block_map) != -1:
-        block = next(block_iterator)
-        block_map[block.y][block.x] = "#"
+    return blocks[count - 1]
 
-    return block
+
+SEARCHES = {"union-find": find_first_invalid, "bisect": find_first_invalid_bisect}
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--search",
+        choices=SEARCHES,
+        default="union-find",
+        help="lift the bytes in reverse through a union-find, or bisect the drops",
+    )
+    parser.add_argument("--width", type=int, default=WIDTH)
+    parser.add_argument("--height", type=int, default=HEIGHT)
+    parser.add_argument(
+        "--bytes",
+        type=int,
+        help="number of bytes that fall at most, all of the input by default",
+    )
+    args = parser.parse_args()
+
     lines = sys.stdin.readlines()
-    blocks = parse_blocks(lines)
+    blocks = parse_blocks(lines[: args.bytes])
 
-    print(find_first_invalid(WIDTH, HEIGHT, blocks))
+    x, y = SEARCHES[args.search](args.width, args.height, blocks)
+    print(f"{x},{y}")
 
 
 if __name__ == "__main__":
@@ -1,8 +1,18 @@
 #!/usr/bin/env python3
 
+import argparse
+import hashlib
+import multiprocessing
+import sqlite3
 import sys
 from collections.abc import Iterable
-from functools import cache
+from contextlib import closing
+from itertools import batched
+
+CHUNKS_PER_WORKER = 4
+LOOKUP_BATCH = 900
+
+CACHE_TABLE = "arrangements"
 
 
 def parse_input_towels(line: str) -> list[str]:
@@ -13,40 +23,177 @@ def parse_wanted_towels(lines: Iterable[str]) -> list[str]:
     return [towel.strip() for towel in lines]
 
 
-def get_possible(towels: Iterable[str], pattern: str, current_pattern: str = "") -> int:
-    @cache
-    def get_possible_util(pattern: str, current_pattern: str) -> int:
-        if current_pattern == pattern:
-            return 1
+class TowelTrie:
+    """Towels merged by their common prefixes, node 0 is the root and every
+    node knows whether a towel ends in it"""
+
+    def __init__(self, towels: Iterable[str]) -> None:
+        self.children: list[dict[str, int]] = [{}]
+        self.complete = bytearray(1)
 
-        if not pattern.startswith(current_pattern) or len(current_pattern) > len(
-            pattern
-        ):
-            return 0
+        for towel in towels:
+            self.add(towel)
 
-        count = 0
-        for t in towels:
-            count += get_possible_util(pattern, current_pattern + t)
+    def add(self, towel: str) -> None:
+        node = 0
+        for stripe in towel:
+            next_node = self.children[node].get(stripe)
+            if next_node is None:
+                next_node = len(self.children)
+                self.children[node][stripe] = next_node
+                self.children.append({})
+                self.complete.append(0)
+            node = next_node
 
-        return count
+        self.complete[node] = 1
 
-    return get_possible_util(pattern, current_pattern)
+    def get_possible(self, pattern: str) -> int:
+        """Walks the trie from every index of the pattern, last to first, the
+        arrangements from an index add up over the towels starting there"""
 
+        children = self.children
+        complete = self.complete
+        size = len(pattern)
 
-def count_possible(towels: Iterable[str], patterns: Iterable[str]) -> int:
-    count = 0
-    for pattern in patterns:
-        count += get_possible(towels, pattern)
+        counts = [0] * size + [1]
+        for start in range(size - 1, -1, -1):
+            node = 0
+            count = 0
+            for end in range(start, size):
+                next_node = children[node].get(pattern[end])
+                if next_node is None:
+                    break
+                node = next_node
+                if complete[node]:
+                    count += counts[end + 1]
+
+            counts[start] = count
+
+        return counts[0]
+
+
+# Read-only state of a worker process, inherited through fork instead of pickled
+worker_trie: TowelTrie
+
+
+def init_worker(trie: TowelTrie) -> None:
+    global worker_trie
+    worker_trie = trie
+
+
+def count_possible_chunk(patterns: list[str]) -> list[int]:
+    return [worker_trie.get_possible(pattern) for pattern in patterns]
+
+
+def solve_patterns(
+    trie: TowelTrie, patterns: list[str], workers: int = 1
+) -> dict[str, int]:
+    if workers <= 1:
+        return {pattern: trie.get_possible(pattern) for pattern in patterns}
+
+    chunk_count = workers * CHUNKS_PER_WORKER
+    chunks = [patterns[i::chunk_count] for i in range(chunk_count)]
+
+    # Fork hands the trie to every worker without copying it, only the pattern
+    # chunks are pickled
+    context = multiprocessing.get_context("fork")
+    with context.Pool(workers, init_worker, (trie,)) as pool:
+        results = pool.map(count_possible_chunk, chunks)
+
+    return {
+        pattern: result
+        for chunk, chunk_results in zip(chunks, results)
+        for pattern, result in zip(chunk, chunk_results)
+    }
+
+
+def hash_towels(towels: Iterable[str]) -> str:
+    # Order and repeats of the towels do not change the trie
+    return hashlib.sha256(",".join(sorted(set(towels))).encode()).hexdigest()
+
+
+def load_cached(
+    connection: sqlite3.Connection, towels_hash: str, patterns: Iterable[str]
+) -> dict[str, int]:
+    results: dict[str, int] = {}
+    # Batches stay under the default limit of 999 SQLite variables, each one is
+    # looked up through the (towels, design) primary key
+    for batch in batched(set(patterns), LOOKUP_BATCH):
+        rows = connection.execute(
+            f"SELECT design, value FROM {CACHE_TABLE}"
+            f" WHERE towels = ? AND design IN ({', '.join('?' * len(batch))})",
+            (towels_hash, *batch),
+        )
+        results.update((design, int(value)) for design, value in rows)
+
+    return results
+
+
+def store_cached(
+    connection: sqlite3.Connection, towels_hash: str, results: dict[str, int]
+) -> None:
+    # Counts outgrow SQLite integers, so they are stored as text
+    with connection:
+        connection.executemany(
+            f"INSERT OR REPLACE INTO {CACHE_TABLE} VALUES (?, ?, ?)",
+            ((towels_hash, design, str(value)) for design, value in results.items()),
+        )
+
+
+def count_possible(
+    towels: Iterable[str],
+    patterns: Iterable[str],
+    workers: int = 1,
+    cache_path: str | None = None,
+) -> int:
+    """Solves every distinct pattern once, in worker processes if asked to,
+    skipping the ones a cache file already holds for the same towel set"""
+
+    towels = list(towels)
+    patterns = list(patterns)
+    trie = TowelTrie(towels)
+
+    distinct = list(dict.fromkeys(patterns))
+    if cache_path is None:
+        results = solve_patterns(trie, distinct, workers)
+    else:
+        towels_hash = hash_towels(towels)
+        with closing(sqlite3.connect(cache_path)) as connection:
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {CACHE_TABLE}"
+                " (towels TEXT, design TEXT, value, PRIMARY KEY (towels, design))"
+            )
+            results = load_cached(connection, towels_hash, distinct)
+            missing = [pattern for pattern in distinct if pattern not in results]
+            solved = solve_patterns(trie, missing, workers)
+            store_cached(connection, towels_hash, solved)
 
-    return count
+        results |= solved
+
+    return sum(results[pattern] for pattern in patterns)
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="solve the designs in N processes",
+    )
+    parser.add_argument(
+        "--cache",
+        metavar="PATH",
+        help="keep solved designs in an SQLite file, reused by later runs",
+    )
+    args = parser.parse_args()
+
     lines = sys.stdin.readlines()
     towels = parse_input_towels(lines[0])
     required_patterns = parse_wanted_towels(lines[2:])
 
-    print(count_possible(towels, required_patterns))
+    print(count_possible(towels, required_patterns, args.workers, args.cache))
 
 
 if __name__ == "__main__":
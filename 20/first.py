@@ -3,134 +3,75 @@
 from __future__ import annotations
 
 import sys
-from collections import deque
-from collections.abc import Iterable
-from dataclasses import dataclass
-from typing import Literal
+from collections.abc import Iterable, Sequence
+from pathlib import Path
 
-type Position = Vector
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-type Start = Literal["S"]
-type End = Literal["E"]
-type Empty = Literal["."]
-type Wall = Literal["#"]
-type Map = list[list[Start | End | Empty | Wall]]
+from grid import UNREACHED, Cell, Grid, bfs  # noqa: E402
 
 
 class NotFoundException(Exception):
     pass
 
 
-@dataclass(frozen=True)
-class Vector:
-    x: int
-    y: int
-
-    def __add__(self, other: Vector) -> Vector:
-        return Vector(self.x + other.x, self.y + other.y)
-
-    def __sub__(self, other: Vector) -> Vector:
-        return Vector(self.x - other.x, self.y - other.y)
-
-
 class RaceMap:
-    race_map: Map
-    distance_map: dict[Position, int]
+    race_map: Grid
+    distance_map: Sequence[int]
 
     def __init__(self, lines: Iterable[str]) -> None:
-        self.__init_race_map(lines)
-        self.__init_distance_map()
-
-    def __init_race_map(self, lines: Iterable[str]) -> None:
-        self.race_map = []
-        for line in lines:
-            self.race_map.append(list(line))  # type: ignore[arg-type]
+        self.race_map = Grid.from_lines([line.rstrip("\n") for line in lines])
+        self.distance_map = bfs(self.race_map, self.__find_element("S"))
 
-    def __find_element(self, needle: Start | End) -> Position:
+    def __find_element(self, needle: str) -> Cell:
         """Finds the element in race_map
 
         :param needle: 'S' or 'E', anything else doesn't make sense
-        :type needle: Start | End
+        :type needle: str
         :raises NotFoundException: When needle can't be found
-        :return: Position of the needle in the map
-        :rtype: Position
+        :return: Cell of the needle in the map
+        :rtype: Cell
         """
-        for y, line in enumerate(self.race_map):
-            for x, c in enumerate(line):
-                if c == needle:
-                    return Vector(x, y)
-
-        raise NotFoundException
-
-    def __get_valid_next_positions(self, position: Position) -> list[Position]:
-        return list(
-            filter(
-                lambda p: p.x >= 0
-                and p.x < self.__width
-                and p.y >= 0
-                and p.y < self.__height
-                and self.race_map[p.y][p.x] != "#",
-                (
-                    position + v
-                    for v in [Vector(0, -1), Vector(1, 0), Vector(0, 1), Vector(-1, 0)]
-                ),
-            )
-        )
+        if (cell := self.race_map.find(needle)) == -1:
+            raise NotFoundException
 
-    def __init_distance_map(self) -> None:
-        self.distance_map = {}
-
-        to_be_visited: deque[tuple[Position, int]] = deque()
-        to_be_visited.append((self.__find_element("S"), 0))
-
-        while len(to_be_visited) != 0:
-            position, distance = to_be_visited.popleft()
-            self.distance_map[position] = distance
-
-            for new_position in self.__get_valid_next_positions(position):
-                if new_position not in self.distance_map.keys():
-                    to_be_visited.append((new_position, distance + 1))
-
-    def __count_cheats_position(self, minimum_time: int, position: Position) -> int:
-        new_positions = (
-            position + v
-            for v in [
-                Vector(0, -2),
-                Vector(1, -1),
-                Vector(2, 0),
-                Vector(1, 1),
-                Vector(0, 2),
-                Vector(-1, 1),
-                Vector(-2, 0),
-                Vector(-1, -1),
-            ]
-        )
+        return cell
+
+    def __count_cheats_position(self, minimum_time: int, cell: Cell) -> int:
+        race_map = self.race_map
+        distance_map = self.distance_map
+        x, y = race_map.position(cell)
 
         count = 0
-        for new_position in new_positions:
-            if new_position in self.distance_map.keys():
-                diff = self.distance_map[new_position] - self.distance_map[position]
-                if diff >= minimum_time + 2:
-                    count += 1
+        for shift_x, shift_y in [
+            (0, -2),
+            (1, -1),
+            (2, 0),
+            (1, 1),
+            (0, 2),
+            (-1, 1),
+            (-2, 0),
+            (-1, -1),
+        ]:
+            new_x, new_y = x + shift_x, y + shift_y
+            if not (
+                0 <= new_x < race_map.width - 2 and 0 <= new_y < race_map.height - 2
+            ):
+                continue
+
+            new_distance = distance_map[race_map.cell(new_x, new_y)]
+            if new_distance - distance_map[cell] >= minimum_time + 2:
+                count += 1
 
         return count
 
     def count_cheats(self, minimum_time: int) -> int:
         return sum(
-            [
-                self.__count_cheats_position(minimum_time, position)
-                for position in self.distance_map.keys()
-            ]
+            self.__count_cheats_position(minimum_time, cell)
+            for cell, distance in enumerate(self.distance_map)
+            if distance != UNREACHED
         )
 
-    @property
-    def __width(self) -> int:
-        return len(self.race_map[0])
-
-    @property
-    def __height(self) -> int:
-        return len(self.race_map)
-
 
 def main() -> None:
     lines = sys.stdin.readlines()
@@ -3,139 +3,138 @@
 from __future__ import annotations
 
 import sys
-from collections import deque
-from collections.abc import Iterable
-from dataclasses import dataclass
-from functools import cache
-from typing import Literal
+from array import array
+from collections.abc import Iterable, Sequence
+from pathlib import Path
 
-type Position = Vector
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
-type Start = Literal["S"]
-type End = Literal["E"]
-type Empty = Literal["."]
-type Wall = Literal["#"]
-type Map = list[list[Start | End | Empty | Wall]]
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from grid import UNREACHED, Cell, Grid, bfs  # noqa: E402
 
 
 class NotFoundException(Exception):
     pass
 
 
-@dataclass(frozen=True)
-class Vector:
-    x: int
-    y: int
-
-    def __add__(self, other: Vector) -> Vector:
-        return Vector(self.x + other.x, self.y + other.y)
-
-    def __sub__(self, other: Vector) -> Vector:
-        return Vector(self.x - other.x, self.y - other.y)
-
-
 class RaceMap:
-    race_map: Map
-    distance_map: dict[Position, int]
+    race_map: Grid
+    distance_map: Sequence[int]
 
     def __init__(self, lines: Iterable[str]) -> None:
-        self.__init_race_map(lines)
-        self.__init_distance_map()
-
-    def __init_race_map(self, lines: Iterable[str]) -> None:
-        self.race_map = []
-        for line in lines:
-            self.race_map.append(list(line))  # type: ignore[arg-type]
+        self.race_map = Grid.from_lines([line.rstrip("\n") for line in lines])
+        self.distance_map = bfs(self.race_map, self.__find_element("S"))
 
-    def __find_element(self, needle: Start | End) -> Position:
+    def __find_element(self, needle: str) -> Cell:
         """Finds the element in race_map
 
         :param needle: 'S' or 'E', anything else doesn't make sense
-        :type needle: Start | End
+        :type needle: str
         :raises NotFoundException: When needle can't be found
-        :return: Position of the needle in the map
-        :rtype: Position
+        :return: Cell of the needle in the map
+        :rtype: Cell
         """
-        for y, line in enumerate(self.race_map):
-            for x, c in enumerate(line):
-                if c == needle:
-                    return Vector(x, y)
-
-        raise NotFoundException
-
-    def __get_valid_next_positions(self, position: Position) -> list[Position]:
-        return list(
-            filter(
-                lambda p: p.x >= 0
-                and p.x < self.__width
-                and p.y >= 0
-                and p.y < self.__height
-                and self.race_map[p.y][p.x] != "#",
-                (
-                    position + v
-                    for v in [Vector(0, -1), Vector(1, 0), Vector(0, 1), Vector(-1, 0)]
-                ),
-            )
-        )
-
-    def __init_distance_map(self) -> None:
-        self.distance_map = {}
-
-        to_be_visited: deque[tuple[Position, int]] = deque()
-        to_be_visited.append((self.__find_element("S"), 0))
-
-        while len(to_be_visited) != 0:
-            position, distance = to_be_visited.popleft()
-            self.distance_map[position] = distance
-
-            for new_position in self.__get_valid_next_positions(position):
-                if new_position not in self.distance_map.keys():
-                    to_be_visited.append((new_position, distance + 1))
-
-    @cache
-    @staticmethod
-    def __generate_shifted_positions(length: int) -> set[Position]:
-        positions: set[Position] = set()
-        for i in range(0, length + 1):
-            positions.add(Vector(i, length - i))
-            positions.add(Vector(-i, length - i))
-            positions.add(Vector(i, -(length - i)))
-            positions.add(Vector(-i, -(length - i)))
-
-        return positions
-
-    def __count_cheats_position(
-        self, minimum_time: int, position: Position, max_len: int
-    ) -> int:
+        if (cell := self.race_map.find(needle)) == -1:
+            raise NotFoundException
+
+        return cell
+
+    def __pad_distances(self, margin: int, fill: int) -> tuple[array[int], int]:
+        """Distances of the map cells inside a border of margin fill cells, so
+        no cheat within margin steps ever leaves the array"""
+
+        race_map = self.race_map
+        inner_width = race_map.width - 2
+        width = inner_width + 2 * margin
+
+        padded = array("i", [fill]) * (width * (race_map.height - 2 + 2 * margin))
+        for y in range(race_map.height - 2):
+            start = race_map.cell(0, y)
+            row = self.distance_map[start : start + inner_width]
+            padded_start = (y + margin) * width + margin
+            padded[padded_start : padded_start + inner_width] = array("i", row)
+
+        return padded, width
+
+    def __count_cheats_python(self, minimum_time: int, max_len: int) -> int:
+        targets, width = self.__pad_distances(max_len, UNREACHED)
+        rings = generate_rings(width, max_len)
+        last_distance = max(targets)
+
         count = 0
-        for i in range(1, max_len + 1):
-            new_positions = (
-                position + v for v in RaceMap.__generate_shifted_positions(i)
-            )
-
-            for new_position in new_positions:
-                if new_position in self.distance_map.keys():
-                    diff = self.distance_map[new_position] - self.distance_map[position]
-                    if diff >= minimum_time + i:
+        # Track cells ordered by distance, a cheat has to end at least
+        # minimum_time + 1 cells further down the track
+        for cell in sorted(
+            (cell for cell, distance in enumerate(targets) if distance != UNREACHED),
+            key=targets.__getitem__,
+        ):
+            distance = targets[cell] + minimum_time
+            if distance + 1 > last_distance:
+                break
+
+            for length, deltas in enumerate(rings, 1):
+                threshold = distance + length
+                if threshold > last_distance:
+                    break
+
+                for delta in deltas:
+                    if targets[cell + delta] >= threshold:
                         count += 1
 
         return count
 
+    def __count_cheats_numpy(self, minimum_time: int, max_len: int) -> int:
+        race_map = self.race_map
+        height = race_map.height - 2
+        padded, width = self.__pad_distances(max_len, UNREACHED)
+        targets = np.frombuffer(padded, dtype=np.int32).reshape(-1, width)
+
+        # Walls never start a cheat, their distance is too large to ever gain
+        window = targets[max_len : max_len + height, max_len : width - max_len]
+        sources = np.where(window == UNREACHED, np.iinfo(np.int32).max // 2, window)
+
+        count = 0
+        for dy in range(-max_len, max_len + 1):
+            for dx in range(abs(dy) - max_len, max_len - abs(dy) + 1):
+                length = abs(dx) + abs(dy)
+                if not length:
+                    continue
+
+                shifted = targets[
+                    max_len + dy : max_len + dy + height,
+                    max_len + dx : width - max_len + dx,
+                ]
+                count += int(
+                    np.count_nonzero(shifted - sources >= minimum_time + length)
+                )
+
+        return count
+
     def count_cheats(self, minimum_time: int, max_len: int) -> int:
-        return sum(
-            [
-                self.__count_cheats_position(minimum_time, position, max_len)
-                for position in self.distance_map.keys()
-            ]
-        )
-
-    @property
-    def __width(self) -> int:
-        return len(self.race_map[0])
-
-    @property
-    def __height(self) -> int:
-        return len(self.race_map)
+        """Counts the cheats of at most max_len steps that save minimum_time,
+        one shift of the whole map per cheat vector when NumPy is available"""
+
+        if np is not None:
+            return self.__count_cheats_numpy(minimum_time, max_len)
+
+        return self.__count_cheats_python(minimum_time, max_len)
+
+
+def generate_rings(width: int, max_len: int) -> list[list[int]]:
+    """Cell offsets of every Manhattan distance from 1 to max_len in a map of
+    the given width"""
+
+    rings: list[list[int]] = [[] for _ in range(max_len)]
+    for dy in range(-max_len, max_len + 1):
+        for dx in range(abs(dy) - max_len, max_len - abs(dy) + 1):
+            if length := abs(dx) + abs(dy):
+                rings[length - 1].append(dy * width + dx)
+
+    return rings
 
 
 def main() -> None:
@@ -1,82 +1,107 @@
 #!/usr/bin/env python3
 
-from typing import Literal
+from __future__ import annotations
 
-type Orientation = Literal["Up", "Right", "Down", "Left"]
-type Map = list[list[str]]
+from dataclasses import dataclass
+
+type Position = int
+type Direction = int
+type State = int
+
+UP, RIGHT, DOWN, LEFT = range(4)
+
+OUTSIDE = 0
+WALL = ord("#")
+GUARD = ord("^")
+
+
+@dataclass
+class Map:
+    """Row-major grid padded with an OUTSIDE cell on every side, so a step never
+    needs a bounds check"""
+
+    cells: bytearray
+    width: int
+    height: int
+
+    @property
+    def offsets(self) -> tuple[int, int, int, int]:
+        return -self.width, 1, self.width, -1
+
+    @staticmethod
+    def from_lines(lines: list[str]) -> Map:
+        width = len(lines[0]) + 2
+        cells = bytearray(width)
+        for line in lines:
+            cells += b"\0" + line.encode() + b"\0"
+        cells += bytearray(width)
+
+        return Map(cells, width, len(lines) + 2)
+
+
+def pack_state(position: Position, direction: Direction) -> State:
+    return position << 2 | direction
 
 
 def parse_input() -> Map:
-    current_map: Map = []
+    lines: list[str] = []
 
     try:
         while (line := input()) is not None:
-            current_map.append(list(line))
+            lines.append(line)
     except EOFError:
         pass
 
-    return current_map
+    return Map.from_lines(lines)
 
 
-def find_guard(current_map: Map) -> tuple[int, int]:
-    for y, line in enumerate(current_map):
-        for x, c in enumerate(line):
-            if c == "^":
-                return x, y
+def find_guard(current_map: Map) -> Position:
+    return current_map.cells.find(GUARD)
 
-    return -1, -1
 
+def traverse_map(
+    current_map: Map,
+    position: Position,
+    direction: Direction,
+    visited_states: bytearray,
+) -> bool:
+    """Returns true if loops, false otherwise, marks every visited state"""
 
-def get_shifted_position(x: int, y: int, orientation: Orientation) -> tuple[int, int]:
-    if orientation == "Up":
-        return x, y - 1
-    if orientation == "Right":
-        return x + 1, y
-    if orientation == "Down":
-        return x, y + 1
-    if orientation == "Left":
-        return x - 1, y
+    cells = current_map.cells
+    offsets = current_map.offsets
+    offset = offsets[direction]
 
+    while True:
+        state = pack_state(position, direction)
+        if visited_states[state]:
+            return True
 
-def rotate_right(current_orientation: Orientation) -> Orientation:
-    orientations: list[Orientation] = ["Up", "Right", "Down", "Left"]
-    return orientations[(orientations.index(current_orientation) + 1) % 4]
+        visited_states[state] = 1
+        new_position = position + offset
+        cell = cells[new_position]
 
+        if cell == OUTSIDE:
+            return False
 
-def traverse_map(current_map: Map, default_orientation: Orientation = "Up") -> None:
-    x, y = find_guard(current_map)
-    orientation = default_orientation
+        if cell == WALL:
+            direction = (direction + 1) & 3
+            offset = offsets[direction]
+        else:
+            position = new_position
 
-    while True:
-        new_x, new_y = get_shifted_position(x, y, orientation)
-        current_map[y][x] = "X"
-        if (
-            new_x < 0
-            or new_x >= len(current_map[0])
-            or new_y < 0
-            or new_y >= len(current_map)
-        ):
-            break
-
-        if (
-            current_map[new_y][new_x] == "X"
-            or current_map[new_y][new_x] == "."
-            or current_map[new_y][new_x] == "^"  # Probably useless
-        ):
-            x, y = new_x, new_y
-        elif current_map[new_y][new_x] == "#":
-            orientation = rotate_right(orientation)
-
-
-def count_traversed(current_map: Map) -> int:
-    return [c for line in current_map for c in line].count("X")
+
+def count_traversed(visited_states: bytearray) -> int:
+    # All four direction flags of a position share one 32-bit word
+    words = memoryview(visited_states).cast("I").tolist()
+    return len(words) - words.count(0)
 
 
 def main() -> None:
     current_map = parse_input()
-    traverse_map(current_map)
+    visited_states = bytearray(len(current_map.cells) * 4)
+    traverse_map(current_map, find_guard(current_map), UP, visited_states)
 
-    print(count_traversed(current_map))
+    print(count_traversed(visited_states))
 
 
 if __name__ == "__main__":
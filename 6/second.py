@@ -1,100 +1,358 @@
 #!/usr/bin/env python3
 
-from copy import deepcopy
-from typing import Literal
+from __future__ import annotations
 
-type Orientation = Literal["Up", "Right", "Down", "Left"]
-type Map = list[list[str]]
+import argparse
+import multiprocessing
+import random
+import time
+from array import array
+from dataclasses import dataclass
+
+type Position = int
+type Direction = int
+type State = int
+type JumpTable = tuple[array[int], array[int], array[int], array[int]]
+
+UP, RIGHT, DOWN, LEFT = range(4)
+
+OUTSIDE = 0
+WALL = ord("#")
+GUARD = ord("^")
+
+BRUTE_FORCE_LIMIT = 200
+CHUNKS_PER_WORKER = 4
+
+# Read-only state of a worker process, inherited through fork instead of pickled
+worker_map: Map
+worker_jumps: JumpTable
+
+
+@dataclass
+class Map:
+    """Row-major grid padded with an OUTSIDE cell on every side, so a step never
+    needs a bounds check"""
+
+    cells: bytearray
+    width: int
+    height: int
+
+    @property
+    def offsets(self) -> tuple[int, int, int, int]:
+        return -self.width, 1, self.width, -1
+
+    @staticmethod
+    def from_lines(lines: list[str]) -> Map:
+        width = len(lines[0]) + 2
+        cells = bytearray(width)
+        for line in lines:
+            cells += b"\0" + line.encode() + b"\0"
+        cells += bytearray(width)
+
+        return Map(cells, width, len(lines) + 2)
+
+
+def pack_state(position: Position, direction: Direction) -> State:
+    return position << 2 | direction
 
 
 def parse_input() -> Map:
-    current_map: Map = []
+    lines: list[str] = []
 
     try:
         while (line := input()) is not None:
-            current_map.append(list(line))
+            lines.append(line)
     except EOFError:
         pass
 
-    return current_map
+    return Map.from_lines(lines)
+
+
+def find_guard(current_map: Map) -> Position:
+    return current_map.cells.find(GUARD)
+
+
+def traverse_map(
+    current_map: Map,
+    position: Position,
+    direction: Direction,
+    visited_states: bytearray,
+) -> bool:
+    """Returns true if loops, false otherwise, marks every visited state"""
+
+    cells = current_map.cells
+    offsets = current_map.offsets
+    offset = offsets[direction]
+
+    while True:
+        state = pack_state(position, direction)
+        if visited_states[state]:
+            return True
+
+        visited_states[state] = 1
+        new_position = position + offset
+        cell = cells[new_position]
+
+        if cell == OUTSIDE:
+            return False
+
+        if cell == WALL:
+            direction = (direction + 1) & 3
+            offset = offsets[direction]
+        else:
+            position = new_position
+
+
+def loops(current_map: Map) -> bool:
+    visited_states = bytearray(len(current_map.cells) * 4)
+    return traverse_map(current_map, find_guard(current_map), UP, visited_states)
+
+
+def count_loops_brute_force(current_map: Map) -> int:
+    loops_count = 0
+    cells = current_map.cells
+
+    # Brute force
+    for position, cell in enumerate(cells):
+        if cell == ord("."):
+            cells[position] = WALL
+            if loops(current_map):
+                loops_count += 1
+            cells[position] = cell
+
+    return loops_count
+
 
+def build_jump_table(current_map: Map) -> JumpTable:
+    """For every position and direction, the position where the guard stops in
+    front of a wall, or -1 when the guard walks off the map"""
 
-def find_guard(current_map: Map) -> tuple[int, int]:
-    for y, line in enumerate(current_map):
-        for x, c in enumerate(line):
-            if c == "^":
-                return x, y
+    cells = current_map.cells
+    jumps: JumpTable = (
+        array("i", [-1]) * len(cells),
+        array("i", [-1]) * len(cells),
+        array("i", [-1]) * len(cells),
+        array("i", [-1]) * len(cells),
+    )
 
-    return -1, -1
+    for direction in (UP, RIGHT, DOWN, LEFT):
+        offset = current_map.offsets[direction]
+        jump = jumps[direction]
 
+        # The stop of the next position along the direction is always known first
+        if direction in (UP, LEFT):
+            positions = range(len(cells))
+        else:
+            positions = range(len(cells) - 1, -1, -1)
 
-def get_shifted_position(x: int, y: int, orientation: Orientation) -> tuple[int, int]:
-    if orientation == "Up":
-        return x, y - 1
-    if orientation == "Right":
-        return x + 1, y
-    if orientation == "Down":
-        return x, y + 1
-    if orientation == "Left":
-        return x - 1, y
+        for position in positions:
+            if cells[position] == OUTSIDE:
+                continue
 
+            next_cell = cells[position + offset]
+            if next_cell == WALL:
+                jump[position] = position
+            elif next_cell != OUTSIDE:
+                jump[position] = jump[position + offset]
 
-def rotate_right(current_orientation: Orientation) -> Orientation:
-    orientations: list[Orientation] = ["Up", "Right", "Down", "Left"]
-    return orientations[(orientations.index(current_orientation) + 1) % 4]
+    return jumps
 
 
-def traverse_map(current_map: Map, default_orientation: Orientation = "Up") -> bool:
-    """Returns true if loops, false otherwise"""
+def get_guard_path(current_map: Map) -> list[tuple[Position, State]]:
+    """Positions in the order the guard first enters them, each with the state
+    just before entering, raises ValueError when the guard never leaves"""
 
-    x, y = find_guard(current_map)
-    orientation = default_orientation
+    cells = current_map.cells
+    offsets = current_map.offsets
+    position = find_guard(current_map)
+    direction = UP
 
-    # https://github.com/Goldenlion5648/AdventOfCode2024/blob/master/6.py
-    visited = set()
+    path: list[tuple[Position, State]] = []
+    entered = bytearray(len(cells))
+    entered[position] = 1
+    visited_states = bytearray(len(cells) * 4)
 
     while True:
-        if (x, y, orientation) in visited:
-            return True
+        state = pack_state(position, direction)
+        if visited_states[state]:
+            raise ValueError("the guard loops without an extra obstacle")
+
+        visited_states[state] = 1
+        new_position = position + offsets[direction]
+        cell = cells[new_position]
+
+        if cell == OUTSIDE:
+            return path
+
+        if cell == WALL:
+            direction = (direction + 1) & 3
+            continue
+
+        if not entered[new_position]:
+            entered[new_position] = 1
+            path.append((new_position, pack_state(position, direction)))
+
+        position = new_position
+
+
+def loops_with_obstacle(
+    current_map: Map, jumps: JumpTable, obstacle: Position, state: State
+) -> bool:
+    """Returns true if the guard starting in `state` loops once an extra obstacle
+    is placed, walking whole segments between walls"""
 
-        visited.add((x, y, orientation))
-        new_x, new_y = get_shifted_position(x, y, orientation)
+    width = current_map.width
+    obstacle_row, obstacle_column = divmod(obstacle, width)
+    visited: set[State] = set()
 
-        if (
-            new_x < 0
-            or new_x >= len(current_map[0])
-            or new_y < 0
-            or new_y >= len(current_map)
+    while state not in visited:
+        visited.add(state)
+        position, direction = state >> 2, state & 3
+        stop = jumps[direction][position]
+
+        # The extra obstacle is closer than the next wall, a stop inside the same
+        # row already implies the obstacle shares the row
+        if direction == UP:
+            if (
+                obstacle < position
+                and obstacle >= stop
+                and position % width == obstacle_column
+            ):
+                stop = obstacle + width
+        elif direction == RIGHT:
+            if obstacle > position and (
+                obstacle <= stop if stop >= 0 else position // width == obstacle_row
+            ):
+                stop = obstacle - 1
+        elif direction == DOWN:
+            if (
+                obstacle > position
+                and (stop < 0 or obstacle <= stop)
+                and position % width == obstacle_column
+            ):
+                stop = obstacle - width
+        elif obstacle < position and (
+            obstacle >= stop if stop >= 0 else position // width == obstacle_row
         ):
-            break
+            stop = obstacle + 1
 
-        if current_map[new_y][new_x] == "." or current_map[new_y][new_x] == "^":
-            x, y = new_x, new_y
-        elif current_map[new_y][new_x] == "#":
-            orientation = rotate_right(orientation)
+        if stop < 0:
+            return False
 
-    return False
+        state = stop << 2 | (direction + 1) & 3
 
+    return True
 
-def count_loops(current_map: Map) -> int:
-    loops = 0
 
-    # Brute force
-    for y in range(len(current_map)):
-        for x in range(len(current_map[0])):
-            if current_map[y][x] == ".":
-                current_map[y][x] = "#"
-                if traverse_map(deepcopy(current_map)):
-                    loops += 1
-                current_map[y][x] = "."
+def init_worker(current_map: Map, jumps: JumpTable) -> None:
+    global worker_map, worker_jumps
+    worker_map = current_map
+    worker_jumps = jumps
+
+
+def count_loops_in_chunk(candidates: list[tuple[Position, State]]) -> int:
+    return sum(
+        loops_with_obstacle(worker_map, worker_jumps, obstacle, state)
+        for obstacle, state in candidates
+    )
+
+
+def count_loops(current_map: Map, workers: int = 1) -> int:
+    # Every obstacle off a looping path keeps it looping, only brute force
+    # matches every cell then
+    if loops(current_map):
+        return count_loops_brute_force(current_map)
+
+    jumps = build_jump_table(current_map)
+
+    # Only obstacles on the original path can change it, and the guard walks the
+    # original path until it hits the new obstacle
+    candidates = get_guard_path(current_map)
 
-    return loops
+    if workers <= 1:
+        return sum(
+            loops_with_obstacle(current_map, jumps, obstacle, state)
+            for obstacle, state in candidates
+        )
+
+    chunk_count = workers * CHUNKS_PER_WORKER
+    chunks = [candidates[i::chunk_count] for i in range(chunk_count)]
+
+    # Fork hands the map and jump table to every worker without copying them,
+    # only the candidate chunks are pickled
+    context = multiprocessing.get_context("fork")
+    with context.Pool(workers, init_worker, (current_map, jumps)) as pool:
+        return sum(pool.map(count_loops_in_chunk, chunks))
+
+
+def generate_map(size: int, seed: int = 0) -> Map:
+    rng = random.Random(seed)
+
+    # Like the real input, the guard has to leave the map eventually
+    while True:
+        lines = [
+            "".join("#" if rng.random() < 0.05 else "." for _ in range(size))
+            for _ in range(size)
+        ]
+        current_map = Map.from_lines(lines)
+        current_map.cells[(size // 2 + 1) * current_map.width + size // 2 + 1] = GUARD
+
+        if not loops(current_map):
+            return current_map
+
+
+def benchmark(sizes: list[int], workers: int) -> None:
+    for size in sizes:
+        current_map = generate_map(size)
+
+        start = time.perf_counter()
+        loops_count = count_loops(current_map, workers)
+        elapsed = time.perf_counter() - start
+
+        if size > BRUTE_FORCE_LIMIT:
+            print(
+                f"{size}x{size}: {loops_count} loops, {elapsed:.3f}s"
+                " (brute force skipped)"
+            )
+            continue
+
+        start = time.perf_counter()
+        brute_force_loops = count_loops_brute_force(current_map)
+        brute_force_elapsed = time.perf_counter() - start
+
+        assert loops_count == brute_force_loops
+        print(
+            f"{size}x{size}: {loops_count} loops, {elapsed:.3f}s"
+            f" (brute force {brute_force_elapsed:.3f}s)"
+        )
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--benchmark",
+        type=int,
+        nargs="*",
+        metavar="SIZE",
+        help="time random SIZExSIZE grids, compared against brute force up to"
+        f" {BRUTE_FORCE_LIMIT}x{BRUTE_FORCE_LIMIT}",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="test obstacle candidates in N processes",
+    )
+    args = parser.parse_args()
+
+    if args.benchmark is not None:
+        benchmark(args.benchmark or [10, 50, 100, 200, 500, 1000], args.workers)
+        return
+
     current_map = parse_input()
 
-    print(count_loops(current_map))
+    print(count_loops(current_map, args.workers))
 
 
 if __name__ == "__main__":
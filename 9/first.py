@@ -1,55 +1,76 @@
 #!/usr/bin/env python3
 
+from __future__ import annotations
+
 import sys
+from dataclasses import dataclass
+
+type Gap = tuple[int, int]
+
 
+@dataclass
+class File:
+    id: int
+    start: int
+    size: int
 
-def compute_checksum(disk_data: list[str]) -> int:
-    checksum = 0
-    for i, id in enumerate(disk_data):
-        if id == ".":
-            continue
+    def checksum(self) -> int:
+        # id * (start + (start + 1) + ... + (start + size - 1))
+        return self.id * (self.start * self.size + self.size * (self.size - 1) // 2)
 
-        checksum += i * int(id)
 
-    return checksum
+def compute_checksum(files: list[File]) -> int:
+    return sum(file.checksum() for file in files)
 
 
-def shift_data(disk_data: list[str]) -> list[str]:
-    shifted_data = disk_data.copy()
+def shift_data(files: list[File], gaps: list[Gap]) -> list[File]:
+    """Fills gaps from the left with the last blocks of the rightmost files"""
 
-    front = 0
-    back = len(shifted_data) - 1
+    shifted = files.copy()
+    back = len(shifted) - 1
 
-    while back > front and front != len(shifted_data):
-        while shifted_data[back] == ".":
-            back -= 1
+    for start, size in gaps:
+        while size > 0 and start < shifted[back].start:
+            file = shifted[back]
+            moved = min(size, file.size)
 
-        if shifted_data[front] == ".":
-            shifted_data[front] = shifted_data[back]
-            shifted_data[back] = "."
+            # A partially moved file keeps its leading blocks in place, as a new
+            # File so the caller's files still describe the original disk
+            shifted.append(File(file.id, start, moved))
+            shifted[back] = File(file.id, file.start, file.size - moved)
+            if moved == file.size:
+                back -= 1
 
-        front += 1
+            start += moved
+            size -= moved
 
-    return shifted_data
+    return shifted
 
 
-def generate_disk_from_map(disk_map: str) -> list[str]:
-    disk_data: list[str] = []
+def generate_disk_from_map(disk_map: str) -> tuple[list[File], list[Gap]]:
+    files: list[File] = []
+    gaps: list[Gap] = []
+
+    position = 0
     for i, count in enumerate(disk_map):
+        size = int(count)
+
         if i % 2 == 1:
-            disk_data.extend(["." for _ in range(int(count))])
+            gaps.append((position, size))
         else:
-            disk_data.extend([str(i // 2) for _ in range(int(count))])
+            files.append(File(i // 2, position, size))
+
+        position += size
 
-    return disk_data
+    return files, gaps
 
 
 def main() -> None:
     input_disk_map = sys.stdin.read().strip()
-    expanded_disk_data = generate_disk_from_map(input_disk_map)
-    shifted_data = shift_data(expanded_disk_data)
+    files, gaps = generate_disk_from_map(input_disk_map)
+    shifted_files = shift_data(files, gaps)
 
-    print(compute_checksum(shifted_data))
+    print(compute_checksum(shifted_files))
 
 
 if __name__ == "__main__":
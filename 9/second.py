@@ -2,84 +2,80 @@
 
 from __future__ import annotations
 
+import heapq
 import sys
 from dataclasses import dataclass
 
+type FreeSpans = list[list[int]]
 
-@dataclass
-class Block:
-    empty_size: int
-    size: int
-    data: list[str]
+MAX_SIZE = 9
 
-    def __init__(self, new_data: list[str]) -> None:
-        self.size = len(new_data)
-        self.empty_size = new_data.count(".")
-        self.data = new_data
 
-    def emplace(self, other: Block) -> None:
-        for value in other.data:
-            self.data[self.size - self.empty_size] = value
-            self.empty_size -= 1
+@dataclass
+class File:
+    id: int
+    start: int
+    size: int
 
-    def clear(self) -> None:
-        self.data = ["." for _ in range(self.size)]
-        self.empty_size = self.size
+    def checksum(self) -> int:
+        # id * (start + (start + 1) + ... + (start + size - 1))
+        return self.id * (self.start * self.size + self.size * (self.size - 1) // 2)
 
 
-def compute_checksum(disk_data: list[Block]) -> int:
-    flattened = [x for block in disk_data for x in block.data]
-    checksum = 0
-    for i, id in enumerate(flattened):
-        if id == ".":
-            continue
+def compute_checksum(files: list[File]) -> int:
+    return sum(file.checksum() for file in files)
 
-        checksum += i * int(id)
 
-    return checksum
+def shift_data(files: list[File], free_spans: FreeSpans) -> None:
+    """Moves every file, highest id first, into the leftmost free span it fits"""
 
+    for file in reversed(files):
+        # Leftmost span among all the sizes the file fits into
+        best_size = 0
+        best_start = file.start
+        for size in range(file.size, MAX_SIZE + 1):
+            spans = free_spans[size]
+            if spans and spans[0] < best_start:
+                best_size = size
+                best_start = spans[0]
 
-def shift_data(disk_data: list[Block]) -> None:
-    front = 0
-    back = len(disk_data) - 1
+        if best_size == 0:
+            continue
 
-    while back >= 0:
-        while back > 0 and disk_data[back].empty_size != 0:
-            back -= 1
+        heapq.heappop(free_spans[best_size])
+        if best_size > file.size:
+            heapq.heappush(free_spans[best_size - file.size], best_start + file.size)
 
-        if front < back and disk_data[back].size <= disk_data[front].empty_size:
-            disk_data[front].emplace(disk_data[back])
-            disk_data[back].clear()
-            back -= 1
-            front = 0
-        else:
-            front += 1
+        # The freed space is right of every file yet to move, so it is never reused
+        file.start = best_start
 
-        if front == len(disk_data):
-            front = 0
-            back -= 1
 
+def generate_disk_from_map(disk_map: str) -> tuple[list[File], FreeSpans]:
+    files: list[File] = []
+    free_spans: FreeSpans = [[] for _ in range(MAX_SIZE + 1)]
 
-def generate_disk_from_map(disk_map: str) -> list[Block]:
-    disk_data: list[Block] = []
+    position = 0
     for i, count in enumerate(disk_map):
-        if count == "0":
-            continue
+        size = int(count)
 
         if i % 2 == 1:
-            disk_data.append(Block(["." for _ in range(int(count))]))
+            if size != 0:
+                free_spans[size].append(position)
         else:
-            disk_data.append(Block([str(i // 2) for _ in range(int(count))]))
+            files.append(File(i // 2, position, size))
+
+        position += size
 
-    return disk_data
+    # Spans were appended in increasing order, so every list already is a heap
+    return files, free_spans
 
 
 def main() -> None:
     input_disk_map = sys.stdin.read().strip()
-    expanded_disk_data = generate_disk_from_map(input_disk_map)
-    shift_data(expanded_disk_data)
+    files, free_spans = generate_disk_from_map(input_disk_map)
+    shift_data(files, free_spans)
 
-    print(compute_checksum(expanded_disk_data))
+    print(compute_checksum(files))
 
 
 if __name__ == "__main__":
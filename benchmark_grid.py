@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Times the days built on grid.py against their per-day implementations
+
+The per-day implementations are read from git at --baseline, which has to name
+the revision just before the days moved to grid.py.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+
+type Generator = Callable[[random.Random, int], str]
+
+
+def generate_maze(rng: random.Random, size: int) -> str:
+    rows = [
+        ["#"] + ["#" if rng.random() < 0.2 else "." for _ in range(size - 2)] + ["#"]
+        for _ in range(size - 2)
+    ]
+    rows = [["#"] * size, *rows, ["#"] * size]
+    rows[-2][1] = "S"
+    rows[1][-2] = "E"
+
+    return "".join("".join(row) + "\n" for row in rows)
+
+
+def generate_track(rng: random.Random, size: int) -> str:
+    # A single corridor winding down the map, like the day 20 race tracks
+    rows = [["#"] * size for _ in range(size)]
+    corridors = range(1, size - 1, 2)
+    for i, y in enumerate(corridors):
+        rows[y][1 : size - 1] = ["."] * (size - 2)
+        if i:
+            rows[y - 1][size - 2 if i % 2 else 1] = "."
+
+    rows[1][1] = "S"
+    rows[corridors[-1]][1 if len(corridors) % 2 == 0 else size - 2] = "E"
+
+    return "".join("".join(row) + "\n" for row in rows)
+
+
+def generate_blocks(rng: random.Random, size: int) -> str:
+    # A size x size memory space, every cell but the start and the exit falls
+    # eventually
+    cells = [(x, y) for x in range(size) for y in range(size)]
+    cells = cells[1:-1]
+    rng.shuffle(cells)
+
+    return "".join(f"{x},{y}\n" for x, y in cells)
+
+
+# Scripts that take the memory space from --width and --height, their per-day
+# implementations hardcode it in WIDTH and HEIGHT
+SIZED_SCRIPTS = {"18/first.py", "18/second.py"}
+SIZE_CONSTANT = re.compile(r"^(WIDTH|HEIGHT) = \d+$", re.MULTILINE)
+
+SCRIPTS: dict[str, Generator] = {
+    "16/first.py": generate_maze,
+    "16/second.py": generate_maze,
+    "18/first.py": generate_blocks,
+    "18/second.py": generate_blocks,
+    "20/first.py": generate_track,
+    "20/second.py": generate_track,
+}
+
+
+def time_script(
+    script: Path, data: str, repeat: int, arguments: list[str] | None = None
+) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, script, *(arguments or [])],
+            input=data,
+            text=True,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--baseline",
+        required=True,
+        help="git revision holding the per-day implementations",
+    )
+    parser.add_argument("--size", type=int, default=41, help="side of the mazes")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'script':<14}{'baseline':>10}{'grid.py':>10}{'speedup':>9}")
+
+        for script, generate in SCRIPTS.items():
+            data = generate(random.Random(args.seed), args.size)
+
+            source = subprocess.run(
+                ["git", "show", f"{args.baseline}:{script}"],
+                cwd=ROOT,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+
+            arguments: list[str] = []
+            if script in SIZED_SCRIPTS:
+                source = SIZE_CONSTANT.sub(rf"\1 = {args.size}", source)
+                arguments = ["--width", str(args.size), "--height", str(args.size)]
+
+            baseline = Path(directory) / script.replace("/", "-")
+            baseline.write_text(source)
+
+            old = time_script(baseline, data, args.repeat)
+            new = time_script(ROOT / script, data, args.repeat, arguments)
+            print(f"{script:<14}{old:>9.3f}s{new:>9.3f}s{old / new:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+"""Shortest paths over grids, shared by the days that walk a maze
+
+Cells are integer ids into a flat row-major buffer of characters. The buffer
+is padded with a wall on every side, so a step never needs a bounds check.
+"""
+
+from __future__ import annotations
+
+import sys
+from array import array
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+from heapq import heappop, heappush
+
+type Cell = int
+type Direction = int
+type State = int
+type TurnSearch = Callable[..., tuple[list[int], bytearray]]
+
+UP, RIGHT, DOWN, LEFT = range(4)
+
+WALL = ord("#")
+EMPTY = ord(".")
+
+UNREACHED = -1
+
+# Translates cells into 1 for the ones a walk can never enter
+BLOCKED = bytes(int(i == WALL) for i in range(256))
+
+# Rotations needed to turn by (new - old) & 3 quarter turns clockwise
+ROTATIONS = (0, 1, 2, 1)
+
+
+@dataclass
+class Grid:
+    """Row-major cells padded with a wall on every side"""
+
+    cells: bytearray
+    width: int
+    height: int
+
+    @property
+    def offsets(self) -> tuple[int, int, int, int]:
+        return -self.width, 1, self.width, -1
+
+    @staticmethod
+    def from_lines(lines: list[str]) -> Grid:
+        width = len(lines[0]) + 2
+        cells = bytearray([WALL]) * width
+        for line in lines:
+            cells += b"#" + line.encode() + b"#"
+        cells += bytearray([WALL]) * width
+
+        return Grid(cells, width, len(lines) + 2)
+
+    @staticmethod
+    def empty(width: int, height: int) -> Grid:
+        return Grid.from_lines(["." * width] * height)
+
+    def cell(self, x: int, y: int) -> Cell:
+        return (y + 1) * self.width + x + 1
+
+    def position(self, cell: Cell) -> tuple[int, int]:
+        y, x = divmod(cell, self.width)
+        return x - 1, y - 1
+
+    def find(self, character: str) -> Cell:
+        return self.cells.find(ord(character))
+
+
+def pack_state(cell: Cell, direction: Direction) -> State:
+    return cell << 2 | direction
+
+
+def bfs(grid: Grid, start: Cell, end: Cell | None = None) -> array[int]:
+    """Steps from start to every cell, UNREACHED for the cells it cannot get to,
+    stops as soon as end is reached"""
+
+    cells = grid.cells
+    offsets = grid.offsets
+
+    distances = array("i", [UNREACHED]) * len(cells)
+    distances[start] = 0
+    queue = [start]
+
+    # The queue only grows, so it is walked by index instead of popped
+    for cell in queue:
+        if cell == end:
+            break
+
+        distance = distances[cell] + 1
+        for offset in offsets:
+            new_cell = cell + offset
+            if cells[new_cell] != WALL and distances[new_cell] == UNREACHED:
+                distances[new_cell] = distance
+                queue.append(new_cell)
+
+    return distances
+
+
+def bfs_distance(grid: Grid, start: Cell, end: Cell) -> int:
+    """Steps from start to end, UNREACHED if there is no way
+
+    Only a byte per cell and the current frontier are kept, walls start out as
+    seen and cells are marked when they join the frontier.
+    """
+
+    if start == end:
+        return 0
+
+    offsets = grid.offsets
+    seen = grid.cells.translate(BLOCKED)
+    seen[start] = 1
+
+    frontier = [start]
+    steps = 0
+    while frontier:
+        steps += 1
+        next_frontier = []
+        for cell in frontier:
+            for offset in offsets:
+                new_cell = cell + offset
+                if not seen[new_cell]:
+                    if new_cell == end:
+                        return steps
+                    seen[new_cell] = 1
+                    next_frontier.append(new_cell)
+
+        frontier = next_frontier
+
+    return UNREACHED
+
+
+def bfs_01(grid: Grid, start: Cell, costs: bytes | bytearray) -> array[int]:
+    """Cheapest price from start to every cell, entering a cell costs 0 or 1 as
+    given by costs, walls are never entered"""
+
+    cells = grid.cells
+    offsets = grid.offsets
+
+    prices = array("i", [UNREACHED]) * len(cells)
+    done = bytearray(len(cells))
+    prices[start] = 0
+    queue = deque([start])
+
+    while queue:
+        cell = queue.popleft()
+        if done[cell]:
+            continue
+
+        done[cell] = 1
+        price = prices[cell]
+        for offset in offsets:
+            new_cell = cell + offset
+            if cells[new_cell] == WALL or done[new_cell]:
+                continue
+
+            new_price = price + costs[new_cell]
+            if prices[new_cell] == UNREACHED or new_price < prices[new_cell]:
+                prices[new_cell] = new_price
+                if costs[new_cell]:
+                    queue.append(new_cell)
+                else:
+                    queue.appendleft(new_cell)
+
+    return prices
+
+
+def dijkstra_turns(
+    grid: Grid,
+    start: Cell,
+    direction: Direction,
+    end: Cell | None = None,
+    move_price: int = 1,
+    rotate_price: int = 1000,
+) -> tuple[list[int], bytearray]:
+    """Dijkstra over (cell, direction) states, where every quarter turn costs
+    rotate_price on top of the step, stops once end is reached
+
+    Returns the price of every state and a mask of the directions of its
+    cheapest predecessors, a predecessor itself is always one step back.
+    """
+
+    cells = grid.cells
+    offsets = grid.offsets
+
+    prices = [sys.maxsize] * (len(cells) * 4)
+    predecessors = bytearray(len(cells) * 4)
+
+    start_state = pack_state(start, direction)
+    prices[start_state] = 0
+    priority_queue = [(0, start_state)]
+
+    while priority_queue:
+        price, state = heappop(priority_queue)
+        if price > prices[state]:
+            continue
+
+        cell, direction = state >> 2, state & 3
+        if cell == end:
+            break
+
+        for new_direction in range(4):
+            new_cell = cell + offsets[new_direction]
+            if cells[new_cell] == WALL:
+                continue
+
+            new_price = (
+                price
+                + move_price
+                + ROTATIONS[(new_direction - direction) & 3] * rotate_price
+            )
+            new_state = pack_state(new_cell, new_direction)
+
+            if new_price < prices[new_state]:
+                prices[new_state] = new_price
+                predecessors[new_state] = 1 << direction
+                heappush(priority_queue, (new_price, new_state))
+            elif new_price == prices[new_state]:
+                predecessors[new_state] |= 1 << direction
+
+    return prices, predecessors
+
+
+def dial_turns(
+    grid: Grid,
+    start: Cell,
+    direction: Direction,
+    end: Cell | None = None,
+    move_price: int = 1,
+    rotate_price: int = 1000,
+) -> tuple[list[int], bytearray]:
+    """Same as dijkstra_turns, but the queue is Dial's ring of buckets indexed
+    by price, so states stay plain integers and are never compared"""
+
+    cells = grid.cells
+    offsets = grid.offsets
+
+    prices = [sys.maxsize] * (len(cells) * 4)
+    predecessors = bytearray(len(cells) * 4)
+
+    # No step costs more than a move with two rotations, so the prices waiting
+    # in the queue always fit in one turn of the ring
+    span = move_price + 2 * rotate_price + 1
+    buckets: list[list[State]] = [[] for _ in range(span)]
+    step_prices = [move_price + rotations * rotate_price for rotations in ROTATIONS]
+
+    start_state = pack_state(start, direction)
+    prices[start_state] = 0
+    buckets[0].append(start_state)
+    pending = 1
+    price = -1
+
+    while pending:
+        price += 1
+        bucket = buckets[price % span]
+        if not bucket:
+            continue
+
+        # Free steps land in the bucket being walked, the loop picks them up
+        for state in bucket:
+            pending -= 1
+            if prices[state] != price:
+                continue
+
+            cell, direction = state >> 2, state & 3
+            if cell == end:
+                return prices, predecessors
+
+            for new_direction in range(4):
+                new_cell = cell + offsets[new_direction]
+                if cells[new_cell] == WALL:
+                    continue
+
+                new_price = price + step_prices[(new_direction - direction) & 3]
+                new_state = new_cell << 2 | new_direction
+
+                if new_price < prices[new_state]:
+                    prices[new_state] = new_price
+                    predecessors[new_state] = 1 << direction
+                    buckets[new_price % span].append(new_state)
+                    pending += 1
+                elif new_price == prices[new_state]:
+                    predecessors[new_state] |= 1 << direction
+
+        bucket.clear()
+
+    return prices, predecessors
+
+
+QUEUES: dict[str, TurnSearch] = {"heap": dijkstra_turns, "buckets": dial_turns}
+
+
+def walk_predecessors(
+    grid: Grid, states: list[State], predecessors: bytearray
+) -> set[State]:
+    """Every state on a cheapest path into one of the given states"""
+
+    offsets = grid.offsets
+
+    queue = list(states)
+    visited = set(queue)
+    for state in queue:
+        previous_cell = (state >> 2) - offsets[state & 3]
+        for direction in range(4):
+            previous_state = pack_state(previous_cell, direction)
+            if predecessors[state] >> direction & 1 and previous_state not in visited:
+                visited.add(previous_state)
+                queue.append(previous_state)
+
+    return visited
+
+
+def astar(grid: Grid, start: Cell, end: Cell) -> int:
+    """Steps from start to end, UNREACHED if there is no way, guided by the
+    Manhattan distance to end"""
+
+    cells = grid.cells
+    offsets = grid.offsets
+    width = grid.width
+    end_y, end_x = divmod(end, width)
+
+    def estimate(cell: Cell) -> int:
+        y, x = divmod(cell, width)
+        return abs(x - end_x) + abs(y - end_y)
+
+    distances = array("i", [UNREACHED]) * len(cells)
+    distances[start] = 0
+    priority_queue = [(estimate(start), start)]
+
+    while priority_queue:
+        priority, cell = heappop(priority_queue)
+        if priority > distances[cell] + estimate(cell):
+            continue
+
+        if cell == end:
+            return distances[end]
+
+        distance = distances[cell] + 1
+        for offset in offsets:
+            new_cell = cell + offset
+            if cells[new_cell] == WALL:
+                continue
+
+            if distances[new_cell] == UNREACHED or distance < distances[new_cell]:
+                distances[new_cell] = distance
+                heappush(priority_queue, (distance + estimate(new_cell), new_cell))
+
+    return UNREACHED